@@ -1,10 +1,7 @@
 import streamlit as st
-import pyodbc
-import bcrypt
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
 from streamlit_cookies_manager import EncryptedCookieManager 
 from datetime import datetime
+from core import auth, db, timing, warm
 
 # -----------------------------
 # Page Config
@@ -14,6 +11,7 @@ st.set_page_config(
     page_icon="💰",
     layout="wide"
 )
+trace = timing.start_rerun("login")
 
 # -----------------------------
 # Cookie Manager
@@ -26,76 +24,53 @@ if not cookies.ready():
     st.stop()
 
 # -----------------------------
-# Azure Key Vault
+# Connect Azure SQL (shared pool, credentials from cached Key Vault)
 # -----------------------------
-keyVaultName = "financeproject"
-KVUri = f"https://financeproject.vault.azure.net/"
-credential = DefaultAzureCredential()
-client = SecretClient(vault_url=KVUri, credential=credential)
+pool = db.get_pool(db.FINANCE_DB)
 
-username = client.get_secret("SQL-Username").value
-password = client.get_secret("SQL-Password").value
-
-server = "assetcontrol.database.windows.net"
-database = "finance_project"
-
-# -----------------------------
-# Connect Azure SQL
-# -----------------------------
-def get_connection():
-    conn = pyodbc.connect(
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={server};DATABASE={database};UID={username};PWD={password}"
-    )
-    return conn
+# เริ่ม rebuild ข้อมูล dashboard ใน background ตั้งแต่หน้า login
+warm.get_warmer()
 
 # -----------------------------
 # Database Functions
 # -----------------------------
 def create_user(user_id, user_pass, user_name, role_value):
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        hashed = bcrypt.hashpw(user_pass.encode('utf-8'), bcrypt.gensalt())
-        hashed_str = hashed.decode('utf-8')
+        hashed_str = auth.hash_password(user_pass)
         created_at = datetime.now()
-        cursor.execute(
-            "INSERT INTO User_App (user_ID, user_pass, user_name, Role_user, Status_user, Created_at) VALUES (?, ?, ?, ?, ?, ?)",
-            (user_id, hashed_str, user_name, role_value, 1, created_at)
-        )
-        conn.commit()
-
-        st.session_state.username = user_id
-        st.success("✅ Signup successful! Redirecting...")
-
-        st.session_state.mode = "login"
-        st.rerun()
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO User_App (user_ID, user_pass, user_name, Role_user, Status_user, Created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, hashed_str, user_name, role_value, 1, created_at)
+            )
+            conn.commit()
+            cursor.close()
     except Exception as e:
         st.error(f"❌ Error: {e}")
-    finally:
-        cursor.close()
-        conn.close()
-        
+        return
+
+    st.session_state.username = user_id
+    st.success("✅ Signup successful! Redirecting...")
+
+    st.session_state.mode = "login"
+    st.rerun()
+
+LOGIN_MESSAGES = {
+    "ok": "Login successful ✅",
+    "not_approved": "User not approved yet ❌",
+    "not_found": "Invalid user ID or password ❌",
+    "bad_password": "Invalid user ID or password ❌",
+    "busy": "ระบบกำลังมีผู้ใช้ login จำนวนมาก กรุณาลองใหม่อีกครั้ง ⏳",
+}
+
 def verify_user(user_id, user_pass):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT user_pass, Status_user, Role_user, user_name FROM User_App WHERE user_ID=?", (user_id,))
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    
-    if row:
-        stored_hash, Status_user, role, user_name = row
-        stored_hash = stored_hash.encode('utf-8') if isinstance(stored_hash, str) else stored_hash
-
-        if Status_user == 1:  # 1 = ไม่อนุมัติ
-            return False, "User not approved yet ❌", None
-        
-        if bcrypt.checkpw(user_pass.encode('utf-8'), stored_hash):
-            return True, "Login successful ✅", role
-    
-    return False, "Invalid user ID or password ❌", None
+    # เวลาแต่ละช่วงถูกบันทึกผ่าน timing.observe ใน core/auth.py และเก็บไว้แสดงใน debug panel
+    # เฉพาะ login ที่สำเร็จ (เวลา hash ของ login ที่ล้มบอกได้ว่า user ID นั้นมีอยู่จริงหรือไม่)
+    valid, reason, role, timings = auth.verify_user(pool, user_id, user_pass)
+    if valid:
+        st.session_state.last_login_timing = timings
+    return valid, LOGIN_MESSAGES[reason], role
 # -----------------------------
 # Session State Init (with cookie)
 # -----------------------------
@@ -202,3 +177,5 @@ else:
         login_form()
     else:
         signup_form()
+
+timing.finish_rerun(st, trace, panel=st.session_state.logged_in)
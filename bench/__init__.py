@@ -0,0 +1,3 @@
+# -----------------------------
+# Offline benchmarks (python -m bench.<name>)
+# -----------------------------
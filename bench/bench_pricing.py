@@ -0,0 +1,96 @@
+"""Vectorized pricing engine vs the original per-cell update_all loop.
+
+    python -m bench.bench_pricing --shops 6 50 200 --fees 4 10 30
+
+Every run also checks that both implementations produce identical tables.
+"""
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import pricing
+
+
+def legacy_update_all(df, fees, fee_types):
+    """The loop update_all from pages/3_Scenario.py before vectorization."""
+    for shop in df.columns:
+        shop_norm = shop.strip()
+        price_val = float(df.loc[pricing.PRICE_ROW, shop])
+        discount_val = float(df.loc[pricing.DISCOUNT_ROW, shop])
+        code_discount = float(df.loc[pricing.CODE_ROW, shop])
+        buyer_ship = float(df.loc[pricing.BUYER_SHIP_ROW, shop])
+        actual_ship = float(df.loc[pricing.ACTUAL_SHIP_ROW, shop])
+
+        net_price = price_val - discount_val
+        df.loc[pricing.NET_ROW, shop] = net_price
+
+        buyer_amount = net_price - code_discount - buyer_ship - actual_ship
+        df.loc[pricing.BUYER_ROW, shop] = buyer_amount
+
+        for fee_type in fee_types:
+            rate = fees.get(shop_norm, {}).get(fee_type, 0)
+            df.loc[fee_type, shop] = round(buyer_amount * rate, 2)
+
+        total_fee = sum(df.loc[ft, shop] for ft in pricing.TOTAL_FEE_TYPES if ft in df.index)
+        df.loc[pricing.TOTAL_FEE_ROW, shop] = round(total_fee, 2)
+        df.loc[pricing.REVENUE_ROW, shop] = round(buyer_amount - total_fee, 2)
+    return df
+
+
+def make_case(n_shops, n_fees, seed=0):
+    rng = np.random.default_rng(seed)
+    shops = [f"Shop {i}" for i in range(n_shops)]
+    fee_types = (pricing.TOTAL_FEE_TYPES + [f"Fee {j}" for j in range(n_fees)])[:n_fees]
+    fees = {
+        shop: {ft: float(rng.choice([0.03, 0.0535, 0.0642, 0.1, 0.107])) for ft in fee_types}
+        for shop in shops
+    }
+    df = pricing.empty_table(490, shops, fee_types)
+    df.loc[pricing.PRICE_ROW] = rng.integers(100, 2000, n_shops).astype(float)
+    df.loc[pricing.DISCOUNT_ROW] = rng.integers(0, 100, n_shops).astype(float)
+    df.loc[pricing.CODE_ROW] = rng.integers(0, 50, n_shops).astype(float)
+    df.loc[pricing.BUYER_SHIP_ROW] = rng.integers(0, 60, n_shops).astype(float)
+    df.loc[pricing.ACTUAL_SHIP_ROW] = rng.integers(0, 60, n_shops).astype(float)
+    return df, fees, fee_types
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(n_shops, n_fees):
+    df, fees, fee_types = make_case(n_shops, n_fees)
+    legacy = legacy_update_all(df.copy(), fees, fee_types)
+    vector = pricing.update_all(df.copy(), fees, fee_types)
+    pd.testing.assert_frame_equal(legacy, vector, check_exact=True)
+
+    legacy_s = best_of(lambda: legacy_update_all(df.copy(), fees, fee_types))
+    vector_s = best_of(lambda: pricing.update_all(df.copy(), fees, fee_types))
+    return {
+        "shops": n_shops,
+        "fee_types": n_fees,
+        "legacy_ms": round(legacy_s * 1000, 2),
+        "vector_ms": round(vector_s * 1000, 2),
+        "speedup": round(legacy_s / vector_s, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shops", type=int, nargs="+", default=[6, 50, 200])
+    parser.add_argument("--fees", type=int, nargs="+", default=[4, 10, 30])
+    args = parser.parse_args()
+    rows = [run(s, f) for s, f in itertools.product(args.shops, args.fees)]
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
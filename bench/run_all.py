@@ -0,0 +1,155 @@
+"""Headless run of every page's data pipeline against synthetic data.
+
+    python -m bench.run_all --rows 10000 1000000 --json bench_output.json
+
+Each stage reports wall time, peak Python/NumPy allocation (tracemalloc)
+and rows per second. Caches and snapshots are cleared before each stage
+so the numbers are cold-path numbers.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from bench import standin, synthetic
+from core import auth, cache, dashboard, db, fee_rates, pricing, queries, scenarios, upsert
+from core.sync import TableSync
+
+
+def measure(stage, rows, fn):
+    os.environ["FINANCE_SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="bench-snap-")
+    cache.refresh()
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "stage": stage,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "peak_mb": round(peak / 1e6, 1),
+        "rows_per_s": round(rows / seconds) if seconds else None,
+    }
+
+
+def gp_save():
+    gp = cache.read_sql(db.GP_DB, fee_rates.GP_SQL)
+    edited = gp.copy()
+    edited.loc[edited.index[::10], "GP"] = edited["GP"] + 0.001
+    diff = upsert.diff_frames(gp, edited)
+    with db.get_pool(db.GP_DB).connection() as conn:
+        upsert.apply_diff(conn, "GP", diff, identity=False)
+
+
+def scenario(repeat=50):
+    index = fee_rates.get_fee_index()
+    for _ in range(repeat):
+        df = pricing.empty_table(490, index.shops, index.fee_types)
+        pricing.update_all(df, index.rates, index.fee_types)
+
+
+def scenario_batch(count=50):
+    # ทุก scenario × ทุกร้าน ใน pricing.compute ครั้งเดียว
+    index = fee_rates.get_fee_index()
+    df = pricing.update_all(pricing.empty_table(490, index.shops, index.fee_types), index.rates, index.fee_types)
+    rule_sets = {
+        f"S{i}": [
+            {"type": "discount_pct", "shop": None, "target": None, "value": (i % 10) / 100},
+            {"type": "shipping", "shop": None, "target": None, "value": float(i % 3) * 20},
+            {"type": "fee_rate", "shop": str(index.shops[i % len(index.shops)]),
+             "target": index.fee_types[0], "value": 0.05},
+        ]
+        for i in range(count)
+    }
+    compiled = scenarios.compile_rules(rule_sets, index.shops, index.fee_types)
+    scenarios.evaluate(
+        compiled, df.loc[pricing.INPUT_ROWS].to_numpy(dtype=float).T, index.rates,
+        pricing.extra_fees(df, index.fee_types),
+    )
+
+
+def login(attempts=10):
+    pool = db.get_pool(db.FINANCE_DB)
+    for i in range(attempts):
+        auth.verify_user(pool, f"user{i}", synthetic.BENCH_PASSWORD)
+
+
+def sync_delta(path, inserts=1000):
+    # TableSync.delta() บนสำเนา SQLite: insert แถวใหม่แล้วผลรวมต้องเท่ากับการโหลดทั้งตาราง
+    copy = shutil.copy(path, path + ".sync")
+    spec = queries.AP
+
+    def syncer():
+        return TableSync(
+            spec["table"], spec["keys"], spec["value"],
+            id_col=spec["id"], watermark_col=spec["watermark"], inclusive=spec["inclusive"],
+            connection=lambda: closing(sqlite3.connect(copy)), schema=spec["schema"],
+        )
+
+    live = syncer()
+    live.full_load()
+    part = synthetic.upload_chunk(np.random.default_rng(1), live.watermark + 1, inserts,
+                                  "V", "Vendor_No", "Vendor_Name")
+    with closing(sqlite3.connect(copy)) as conn:
+        part.to_sql(spec["table"], conn, index=False, if_exists="append")
+        conn.commit()
+    fetched = live.delta()
+    full = syncer()
+    full.full_load()
+    os.remove(copy)
+
+    assert fetched == inserts, f"delta fetched {fetched} rows, expected {inserts}"
+    pd.testing.assert_frame_equal(live.grouped_sum(), full.grouped_sum())
+    pd.testing.assert_frame_equal(live.status_counts()[0], full.status_counts()[0])
+    assert live.status_counts()[1] == full.status_counts()[1]
+
+
+def run(rows, workdir, shops, extra_fees):
+    path = os.path.join(workdir, f"bench_{rows}.db")
+    if not os.path.exists(path):
+        synthetic.populate(path, rows, shops=shops, extra_fees=extra_fees)
+    standin.install(path)
+
+    n_gp = shops * (len(pricing.TOTAL_FEE_TYPES) + extra_fees)
+    return [
+        measure("dashboard_sql", rows * 2, lambda: dashboard.build(mode="sql")),
+        measure("dashboard_pandas", rows * 2, lambda: dashboard.build(mode="pandas")),
+        measure("dashboard_stream", rows * 2, lambda: dashboard.build(mode="stream")),
+        measure("gp_save_diff", n_gp, gp_save),
+        measure("scenario_update_all", shops * 50, scenario),
+        measure("scenario_compiled", shops * 50, scenario_batch),
+        measure("login_verify", 10, login),
+        measure("sync_delta", 1000, lambda: sync_delta(path)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--shops", type=int, default=6)
+    parser.add_argument("--extra-fees", type=int, default=0)
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        results.extend(run(rows, args.workdir, args.shops, args.extra_fees))
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
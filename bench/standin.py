@@ -0,0 +1,21 @@
+"""Point the app's shared pools and secret provider at local stand-ins."""
+import os
+import sqlite3
+import tempfile
+
+from core import db, keyvault
+
+
+def install(path, snapshot_dir=None):
+    """Serve both databases from SQLite ``path`` and fake the Key Vault."""
+
+    def connect():
+        return sqlite3.connect(path, check_same_thread=False)
+
+    db.register_pool(db.FINANCE_DB, db.ConnectionPool(connect))
+    db.register_pool(db.GP_DB, db.ConnectionPool(connect))
+    keyvault.set_provider(keyvault.SecretProvider(
+        keyvault.LocalBackend(environ={"SQL_USERNAME": "bench", "SQL_PASSWORD": "bench"}),
+        background=False,
+    ))
+    os.environ["FINANCE_SNAPSHOT_DIR"] = snapshot_dir or tempfile.mkdtemp(prefix="bench-snap-")
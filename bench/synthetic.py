@@ -0,0 +1,71 @@
+"""Synthetic AP / AR / GP / User_App tables in a local SQLite file."""
+import sqlite3
+
+import bcrypt
+import numpy as np
+import pandas as pd
+
+from core import pricing, queries
+
+STATUSES = ["Open", "Paid", "Overdue", "Hold"]
+BENCH_PASSWORD = "bench-password"
+
+
+def upload_chunk(rng, start_id, rows, prefix, party_col, name_col, parties=5000):
+    party = rng.integers(0, parties, rows)
+    due = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 540, rows), unit="D")
+    return pd.DataFrame({
+        "ID": np.arange(start_id, start_id + rows),
+        party_col: pd.Series(party).map(lambda v: f"{prefix}{v:05d}"),
+        name_col: pd.Series(party).map(lambda v: f"{prefix} Name {v}"),
+        "original_duedate": due.strftime("%Y-%m-%d"),
+        "Status_": rng.choice(STATUSES, rows),
+        "amount": rng.uniform(10, 50000, rows).round(2),
+        "Created_at": (due - pd.Timedelta(days=30)).strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+def gp_table(shops=6, extra_fees=0):
+    fee_types = pricing.TOTAL_FEE_TYPES + [f"Fee {j}" for j in range(extra_fees)]
+    rng = np.random.default_rng(1)
+    rows = [
+        (f"Shop {i}", ft, float(rng.choice([0.03, 0.0535, 0.0642, 0.1, 0.107])))
+        for i in range(shops) for ft in fee_types
+    ]
+    df = pd.DataFrame(rows, columns=["Third_party", "ITem_fees", "GP"])
+    df.insert(0, "ID", np.arange(1, len(df) + 1))
+    return df
+
+
+def users_table(n=200):
+    # hash เดียวใช้ทุก user ลดเวลาสร้างข้อมูล (cost เท่ากับของจริง)
+    hashed = bcrypt.hashpw(BENCH_PASSWORD.encode("utf-8"), bcrypt.gensalt(12)).decode("utf-8")
+    return pd.DataFrame({
+        "user_ID": [f"user{i}" for i in range(n)],
+        "user_pass": hashed,
+        "user_name": [f"User {i}" for i in range(n)],
+        "Role_user": 1,
+        "Status_user": 2,
+        "Created_at": "2025-01-01 00:00:00",
+    })
+
+
+def populate(path, rows, shops=6, extra_fees=0, users=200, chunk=500_000, seed=0):
+    """(Re)create every table in ``path`` with ``rows`` rows per upload table."""
+    rng = np.random.default_rng(seed)
+    with sqlite3.connect(path) as conn:
+        for table in ("Cash_AP_Upload", "Cash_AR_Upload", "GP", "User_App"):
+            conn.execute(f"DROP TABLE IF EXISTS [{table}]")
+        for table, prefix, party_col, name_col in (
+            ("Cash_AP_Upload", "V", "Vendor_No", "Vendor_Name"),
+            ("Cash_AR_Upload", "C", "Customer_No", "Customer_Name"),
+        ):
+            for start in range(0, rows, chunk):
+                part = upload_chunk(rng, start + 1, min(chunk, rows - start), prefix, party_col, name_col)
+                part.to_sql(table, conn, index=False, if_exists="append")
+        for spec in (queries.AP, queries.AR):
+            for statement in queries.index_sql(spec, dialect="sqlite"):
+                conn.execute(statement)
+        gp_table(shops, extra_fees).to_sql("GP", conn, index=False)
+        users_table(users).to_sql("User_App", conn, index=False)
+    return path
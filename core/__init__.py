@@ -0,0 +1,3 @@
+# -----------------------------
+# Shared helpers for every page (DB, secrets, caching, ...)
+# -----------------------------
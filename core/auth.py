@@ -0,0 +1,130 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import bcrypt
+
+from core import timing
+
+# -----------------------------
+# Settings
+# -----------------------------
+ROUNDS_ENV = "FINANCE_BCRYPT_ROUNDS"
+WORKERS_ENV = "FINANCE_BCRYPT_WORKERS"
+DEFAULT_ROUNDS = 12
+HASH_TIMEOUT = 30  # วินาที
+
+# bcrypt ปล่อย GIL ระหว่าง hash จึงใช้ thread ได้ และ pool จำกัดจำนวน
+# hash ที่รันพร้อมกัน ไม่ให้ช่วง login พร้อมกันกิน CPU จน script runner ค้าง
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get(WORKERS_ENV, min(4, os.cpu_count() or 1))),
+    thread_name_prefix="bcrypt",
+)
+
+
+def work_factor():
+    return int(os.environ.get(ROUNDS_ENV, DEFAULT_ROUNDS))
+
+
+def _as_bytes(value):
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def cost_of(stored_hash):
+    """Work factor encoded in a ``$2b$12$...`` hash (None if unreadable)."""
+    try:
+        return int(_as_bytes(stored_hash).split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(stored_hash):
+    return cost_of(stored_hash) != work_factor()
+
+
+# -----------------------------
+# Hash / check on the worker pool
+# -----------------------------
+def hash_password(password):
+    rounds = work_factor()
+    future = _executor.submit(
+        lambda: bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds))
+    )
+    return future.result(timeout=HASH_TIMEOUT).decode("utf-8")
+
+
+def check_password(password, stored_hash):
+    future = _executor.submit(bcrypt.checkpw, password.encode("utf-8"), _as_bytes(stored_hash))
+    try:
+        return future.result(timeout=HASH_TIMEOUT)
+    except FutureTimeout:
+        future.cancel()  # ยังไม่ได้เริ่ม (pool เต็ม) ก็ไม่ต้องทำแล้ว
+        raise
+
+
+# -----------------------------
+# Login
+# -----------------------------
+def verify_user(pool, user_id, password):
+    """Look up ``user_id`` and check ``password``.
+
+    Returns ``(ok, reason, role, timings)``. ``reason`` is one of "ok",
+    "not_found", "not_approved", "bad_password" or "busy" (the hash pool
+    did not get to it within ``HASH_TIMEOUT``); ``timings`` splits the
+    attempt into ``db_ms``, ``hash_ms`` (only when the password was
+    checked) and ``total_ms``. A successful login
+    whose hash was made with another work factor is re-hashed in the
+    background.
+    """
+    started = time.perf_counter()
+    timings = {"db_ms": 0.0}
+
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT user_pass, Status_user, Role_user, user_name FROM User_App WHERE user_ID=?", (user_id,))
+        row = cursor.fetchone()
+        cursor.close()
+    timings["db_ms"] = (time.perf_counter() - started) * 1000
+
+    if not row:
+        return _done(False, "not_found", None, timings, started)
+
+    stored_hash, status_user, role, _user_name = row
+    if status_user == 1:  # 1 = ไม่อนุมัติ
+        return _done(False, "not_approved", None, timings, started)
+
+    hash_started = time.perf_counter()
+    try:
+        ok = check_password(password, stored_hash)
+    except FutureTimeout:
+        timings["hash_ms"] = (time.perf_counter() - hash_started) * 1000
+        return _done(False, "busy", None, timings, started)
+    timings["hash_ms"] = (time.perf_counter() - hash_started) * 1000
+    if not ok:
+        return _done(False, "bad_password", None, timings, started)
+
+    if needs_rehash(stored_hash):
+        _executor.submit(_rehash, pool, user_id, password)
+    return _done(True, "ok", role, timings, started)
+
+
+def _rehash(pool, user_id, password):
+    new_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(work_factor())).decode("utf-8")
+    try:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE User_App SET user_pass=? WHERE user_ID=?", (new_hash, user_id))
+            conn.commit()
+            cursor.close()
+    except Exception:
+        pass  # ไม่สำเร็จก็ login ได้ตามปกติ จะลองใหม่ตอน login ครั้งถัดไป
+
+
+def _done(ok, reason, role, timings, started):
+    timings["total_ms"] = (time.perf_counter() - started) * 1000
+    timing.observe("login.db", timings["db_ms"] / 1000)
+    if "hash_ms" in timings:  # not_found / not_approved ไม่ได้ hash -> ไม่ใส่ 0 ลง histogram
+        timing.observe("login.hash", timings["hash_ms"] / 1000)
+    return ok, reason, role, timings
+
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+KINDS = ("week_of_month", "iso_week", "month", "quarter")
+
+
+def _parts(dates):
+    d = pd.to_datetime(pd.Series(dates), errors="coerce")
+    valid = d.notna().to_numpy()
+    year = d.dt.year.fillna(0).astype("int64").to_numpy()
+    month = d.dt.month.fillna(0).astype("int64").to_numpy()
+    day = d.dt.day.fillna(0).astype("int64").to_numpy()
+    return d, valid, year, month, day
+
+
+def _keys(kind, d, year, month, day):
+    if kind == "week_of_month":
+        week = (day - 1) // 7 + 1
+        return year * 1000 + month * 10 + week
+    if kind == "iso_week":
+        iso = d.dt.isocalendar()
+        return (iso["year"].fillna(0).astype("int64").to_numpy() * 100
+                + iso["week"].fillna(0).astype("int64").to_numpy())
+    if kind == "month":
+        return year * 100 + month
+    if kind == "quarter":
+        return year * 10 + (month - 1) // 3 + 1
+    raise ValueError(f"unknown bucket kind {kind!r}, expected one of {KINDS}")
+
+
+def _label(kind, key, with_year):
+    if kind == "week_of_month":
+        year, rest = divmod(key, 1000)
+        month, week = divmod(rest, 10)
+        label = f"w{week}-{month:02d}"
+        return f"{label}-{year}" if with_year else label
+    if kind == "iso_week":
+        year, week = divmod(key, 100)
+        return f"{year}-W{week:02d}"
+    if kind == "month":
+        year, month = divmod(key, 100)
+        return f"{year}-{month:02d}"
+    year, quarter = divmod(key, 10)
+    return f"{year}-Q{quarter}"
+
+
+def bucket(dates, kind="week_of_month", with_year=None):
+    """Bucket dates into calendar periods without a per-row Python call.
+
+    Returns ``(keys, labels)``: ``keys`` is an int64 array that sorts in
+    calendar order (year, then period; -1 for missing dates) and
+    ``labels`` is an ordered Categorical in that same order.
+
+    Week-of-month labels keep the dashboard's ``w{week}-{month}`` format;
+    the year is appended when the data spans more than one year (or when
+    ``with_year=True``) so e.g. January of two years don't collapse.
+    """
+    d, valid, year, month, day = _parts(dates)
+    keys = np.where(valid, _keys(kind, d, year, month, day), -1).astype("int64")
+
+    uniq = np.unique(keys[valid])
+    if with_year is None:
+        with_year = len(np.unique(year[valid])) > 1
+    # สร้าง label เฉพาะค่าที่ไม่ซ้ำ (จำนวนน้อย) แล้ว map กลับด้วย code
+    categories = [_label(kind, int(k), with_year) for k in uniq]
+    if len(set(categories)) < len(categories):
+        categories = [_label(kind, int(k), True) for k in uniq]
+    codes = np.where(valid, np.searchsorted(uniq, keys), -1)
+    labels = pd.Categorical.from_codes(codes, categories=categories, ordered=True)
+    return keys, labels
+
+
+def add_bucket(df, date_col, name, kind="week_of_month", with_year=None):
+    """Add ``name`` (ordered label) and ``name + '_key'`` (int sort key) to ``df``."""
+    keys, labels = bucket(df[date_col], kind=kind, with_year=with_year)
+    df[name] = pd.Series(labels, index=df.index)
+    df[f"{name}_key"] = keys
+    return df
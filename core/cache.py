@@ -0,0 +1,228 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pandas as pd
+
+from core import db, timing
+from core.store import DataStore
+
+DEFAULT_TTL = 600  # วินาที
+STALE_TTL = 30     # วินาที ที่ข้อมูลจาก snapshot อยู่ใน cache ก่อน revalidate สำเร็จ
+
+
+class QueryCache:
+    """Process-wide cache of ``pd.read_sql`` results.
+
+    Entries are keyed by ``(database, sql, params)`` so every session and
+    rerun asking for the same query shares one DataFrame. Concurrent misses
+    on the same key are collapsed into a single DB round trip. Frames live
+    in a DataStore (core/store.py): callers get copy-on-write views, and a
+    byte budget evicts the least recently used unreferenced frames.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_bytes=None):
+        self.ttl = ttl
+        self.store = DataStore() if max_bytes is None else DataStore(max_bytes)
+        self._entries = {}       # key -> (loaded_at, ttl)
+        self._inflight = {}      # key -> Event
+        self._seen = set()       # key ที่เคยโหลดใน process นี้ (ไม่ลบตอน invalidate)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(database, sql, params=None):
+        return (database, " ".join(sql.split()), tuple(params or ()))
+
+    def _fresh(self, entry):
+        loaded_at, ttl = entry
+        return time.monotonic() - loaded_at < ttl
+
+    def get(self, key, loader, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and self._fresh(entry):
+                    view = self.store.get(key)
+                    if view is not None:  # None = ถูก evict ไปแล้ว โหลดใหม่
+                        self.hits += 1
+                        return view
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    # เราเป็นคนโหลด คนอื่นที่ขอ key เดียวกันรอ
+                    waiter = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            waiter.wait()
+            # วนกลับไปอ่านผลจาก cache (ถ้าคนโหลดพลาด เราจะโหลดเอง)
+
+        try:
+            return self.put(key, loader(), ttl)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter.set()
+
+    def put(self, key, df, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        view = self.store.put(key, df)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), ttl)
+            self._seen.add(key)
+        return view
+
+    def seen(self, key):
+        """True once ``key`` has been loaded in this process (even if expired since)."""
+        with self._lock:
+            return key in self._seen
+
+    def invalidate(self, table=None):
+        """Drop every entry, or only those whose SQL mentions ``table``.
+
+        Returns the removed keys.
+        """
+        with self._lock:
+            if table is None:
+                removed = list(self._entries)
+            else:
+                pattern = re.compile(rf"\b{re.escape(table)}\b", re.IGNORECASE)
+                removed = [k for k in self._entries if pattern.search(k[1])]
+            for key in removed:
+                del self._entries[key]
+                self.store.discard(key)
+            return removed
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "store": self.store.stats(),
+            }
+
+
+# -----------------------------
+# Process-wide cache + helper
+# -----------------------------
+query_cache = QueryCache()
+
+
+def read_sql(database, sql, params=None, ttl=None, snapshot=False, schema=None, name=None):
+    """Cached ``pd.read_sql`` against the shared pool for ``database``.
+
+    With ``snapshot=True`` every DB load is also written to a local Arrow
+    file; on a cold process the file is served at once and the query is
+    re-run in the background to refresh both the cache and the file.
+
+    ``schema`` (see core/dtypes.py) compacts the frame once at load time,
+    so the cache and the snapshot hold the small version.
+    """
+    key = QueryCache.make_key(database, sql, params)
+
+    def loader():
+        with db.get_pool(database).connection() as conn, timing.span("sql.read") as s:
+            df = pd.read_sql(sql, conn, params=list(params) if params else None)
+            s["rows"] = len(df)
+        if schema:
+            from core import dtypes
+
+            df = dtypes.compact(df, schema, name=name or sql)
+        if snapshot:
+            _write_snapshot(key, df)
+        return df
+
+    # snapshot ใช้แค่ตอน process เพิ่งเริ่ม; หมด TTL / invalidate แล้วต้องโหลดจาก DB
+    if snapshot and not query_cache.seen(key):
+        cold = _read_snapshot(key)
+        if cold is not None:
+            # TTL สั้น: ถ้า revalidate ล้ม รอบถัดไปจะโหลดจาก DB เองแทนการใช้ snapshot ต่อทั้ง TTL
+            full = query_cache.ttl if ttl is None else ttl
+            view = query_cache.put(key, cold, min(full, STALE_TTL))
+            _revalidate(key, loader, ttl)
+            return view
+
+    return query_cache.get(key, loader, ttl=ttl)
+
+
+def refresh(table=None):
+    for key in query_cache.invalidate(table):
+        _remove_snapshot(key)
+
+
+# -----------------------------
+# Snapshots (pyarrow is only imported when snapshots are used)
+# -----------------------------
+_served_at = ContextVar("snapshots_served_at", default=None)
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def _read_snapshot(key):
+    from core import snapshot
+
+    try:
+        found = snapshot.read(snapshot.name_for(*key))
+    except Exception:
+        return None
+    if found is None:
+        return None
+    served = _served_at.get()
+    if served is not None:
+        served.append(found[1]["written_at"])
+    return found[0]
+
+
+@contextmanager
+def snapshot_times():
+    """Collect ``written_at`` of every snapshot served inside the block.
+
+    The list is shared through the context, so loads running on fetch
+    workers (core/fetch.py copies the context) are included.
+    """
+    served = []
+    token = _served_at.set(served)
+    try:
+        yield served
+    finally:
+        _served_at.reset(token)
+
+
+def _write_snapshot(key, df):
+    from core import snapshot
+
+    try:
+        snapshot.write(snapshot.name_for(*key), df, meta={"database": key[0], "sql": key[1]})
+    except Exception:
+        # snapshot เป็นแค่ตัวช่วย cold start เขียนไม่ได้ก็ยังใช้ข้อมูลจาก DB ต่อได้
+        pass
+
+
+def _remove_snapshot(key):
+    from core import snapshot
+
+    snapshot.remove(snapshot.name_for(*key))
+
+
+def _revalidate(key, loader, ttl):
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    def run():
+        try:
+            query_cache.put(key, loader(), ttl)
+        except Exception:
+            pass  # entry จาก snapshot หมดอายุตาม STALE_TTL แล้วโหลดจาก DB ใหม่
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(key)
+
+    threading.Thread(target=run, name="snapshot-revalidate", daemon=True).start()
@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+
+from core import lazy
+
+go = lazy.module("plotly.graph_objects")
+subplots = lazy.module("plotly.subplots")
+
+FEE_LABEL = "ค่าธรรมเนียมรวม"
+REVENUE_LABEL = "ยอดเงินบริษัทได้รับ"
+COLORS = ["#E74C3C", "#27AE60"]  # แดง / เขียวเข้ม
+ROW_HEIGHT = 260                 # px ต่อแถวของ donut
+
+
+def _donuts(fig, values, titles, cols):
+    """Add one donut per row of ``values`` (n x 2: fee, revenue) to a grid."""
+    for i, (pair, title) in enumerate(zip(values, titles)):
+        fig.add_trace(
+            go.Pie(
+                labels=[FEE_LABEL, REVENUE_LABEL],
+                values=pair,
+                hole=0.5,
+                name=title,
+                sort=False,
+                marker=dict(colors=COLORS, line=dict(color="white", width=2)),
+                showlegend=i == 0,
+            ),
+            row=i // cols + 1,
+            col=i % cols + 1,
+        )
+
+
+def donut_grid(shops, fees, revenues, cols=3, title=None):
+    """One figure with a fee-vs-revenue donut per shop (plotly dict).
+
+    Replaces one ``px.pie`` per shop: a single spec, legend and template
+    per scenario instead of one per shop. None when there are no shops.
+    """
+    if len(shops) == 0:
+        return None  # GP ว่าง: make_subplots(rows=0) ใช้ไม่ได้ (เดิมก็ไม่วาดอะไร)
+    values = np.column_stack([fees, revenues]).astype(float)
+    cols = max(1, min(cols, len(shops)))
+    rows = math.ceil(len(shops) / cols)
+    fig = subplots.make_subplots(
+        rows=rows, cols=cols,
+        specs=[[{"type": "domain"}] * cols for _ in range(rows)],
+        subplot_titles=[str(s) for s in shops],
+    )
+    _donuts(fig, values, [str(s) for s in shops], cols)
+    fig.update_layout(title=title, height=ROW_HEIGHT * rows + 80, margin=dict(t=80, b=20))
+    return fig.to_dict()
+
+
+def donut_comparison(scenarios, shops, fees, revenues):
+    """Every scenario x shop donut in one figure: a row per scenario.
+
+    ``fees`` / ``revenues`` are (scenarios x shops) arrays. None when there
+    are no scenarios or no shops.
+    """
+    if len(scenarios) == 0 or len(shops) == 0:
+        return None
+    fees = np.asarray(fees, dtype=float)
+    revenues = np.asarray(revenues, dtype=float)
+    values = np.stack([fees.ravel(), revenues.ravel()], axis=1)
+    rows, cols = len(scenarios), len(shops)
+    titles = [f"{scenario} · {shop}" for scenario in scenarios for shop in shops]
+    fig = subplots.make_subplots(
+        rows=rows, cols=cols,
+        specs=[[{"type": "domain"}] * cols for _ in range(rows)],
+        subplot_titles=titles,
+    )
+    _donuts(fig, values, titles, cols)
+    fig.update_layout(height=ROW_HEIGHT * rows + 80, margin=dict(t=60, b=20))
+    return fig.to_dict()
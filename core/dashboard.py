@@ -0,0 +1,101 @@
+from functools import partial
+
+import pandas as pd
+
+from core import buckets, fetch, queries, timing
+
+
+def merge_pair(spec, amount_name, mode=None, filters=None):
+    """ERP + EXCEL group sums merged on the spec keys, with Total_Amount and DueWeek."""
+    erp = queries.grouped_sum(spec, amount_name, mode=mode, filters=filters)
+    excel = queries.grouped_sum(spec, "amount_excel", mode=mode, filters=filters)
+
+    erp["original_duedate"] = pd.to_datetime(erp["original_duedate"], format="%Y-%m-%d", errors="coerce")
+    excel["original_duedate"] = pd.to_datetime(excel["original_duedate"], format="%Y-%m-%d", errors="coerce")
+
+    with timing.span("dashboard.merge") as s:
+        merged = pd.merge(erp, excel, on=spec["keys"], how="outer")
+        merged["Total_Amount"] = merged[amount_name] + merged["amount_excel"]
+        buckets.add_bucket(merged, "original_duedate", "DueWeek")
+        s["rows"] = len(merged)
+    return merged
+
+
+def weekly(merged_df, merged_df_ar):
+    """AP/AR totals per due week (plot_df), its AR-AP pivot and the week order."""
+    with timing.span("dashboard.weekly"):
+        return _weekly(merged_df, merged_df_ar)
+
+
+def _weekly(merged_df, merged_df_ar):
+    final_df = pd.concat(
+        [merged_df.assign(Category="AP"), merged_df_ar.assign(Category="AR")],
+        ignore_index=True,
+    )
+    # bucket อีกครั้งหลังรวม ให้ AP/AR ใช้ label ชุดเดียวกัน
+    buckets.add_bucket(final_df, "original_duedate", "DueWeek")
+    plot_df = final_df.groupby(["DueWeek_key", "DueWeek", "Category"], observed=True)["Total_Amount"].sum().reset_index()
+
+    # ปี → เดือน → สัปดาห์
+    plot_df = plot_df.sort_values(by=["DueWeek_key", "Category"])
+    plot_df["DueWeek"] = plot_df["DueWeek"].astype(str)
+    week_order = plot_df["DueWeek"].drop_duplicates().tolist()
+
+    pivot_df = plot_df.pivot_table(index=["DueWeek_key", "DueWeek"], columns="Category", values="Total_Amount").reset_index()
+    pivot_df = pivot_df.reindex(columns=[*pivot_df.columns.drop(["AP", "AR"], errors="ignore"), "AP", "AR"])
+    pivot_df["Difference"] = pivot_df["AR"] - pivot_df["AP"]
+    return plot_df, pivot_df, week_order
+
+
+def _empty_merged(spec, amount_name):
+    merged = pd.DataFrame(columns=[*spec["keys"], amount_name, "amount_excel", "Total_Amount"])
+    merged["original_duedate"] = pd.to_datetime(merged["original_duedate"])
+    merged[[amount_name, "amount_excel", "Total_Amount"]] = merged[[amount_name, "amount_excel", "Total_Amount"]].astype(float)
+    buckets.add_bucket(merged, "original_duedate", "DueWeek")
+    return merged
+
+
+def _empty_status(status_col="Status_"):
+    return pd.DataFrame({status_col: pd.Series(dtype=object), "count": pd.Series(dtype="int64"),
+                         "percentage": pd.Series(dtype=float)})
+
+
+def build(mode=None, timeout=None, ap_filters=None, ar_filters=None):
+    """Every derived dataset the dashboard shows, from the upload tables.
+
+    The four independent datasets are loaded in parallel (core/fetch.py).
+    One that fails or times out is replaced by an empty frame and reported
+    in ``errors`` so the rest of the page still renders.
+    ``ap_filters`` / ``ar_filters`` come from ``queries.make_filters``.
+    """
+    with timing.span("dashboard.fetch"):
+        results, errors = fetch.fetch_all({
+            "merged_df": partial(merge_pair, queries.AP, "amount_AP", mode=mode, filters=ap_filters),
+            "merged_df_ar": partial(merge_pair, queries.AR, "amount_AR", mode=mode, filters=ar_filters),
+            "ap_status_counts": partial(queries.status_counts, queries.AP, mode=mode, filters=ap_filters),
+            "ar_status_counts": partial(queries.status_counts, queries.AR, mode=mode, filters=ar_filters),
+        }, timeout=timeout)
+
+    merged_df = results.get("merged_df")
+    if merged_df is None:
+        merged_df = _empty_merged(queries.AP, "amount_AP")
+    merged_df_ar = results.get("merged_df_ar")
+    if merged_df_ar is None:
+        merged_df_ar = _empty_merged(queries.AR, "amount_AR")
+    plot_df, pivot_df, week_order = weekly(merged_df, merged_df_ar)
+
+    total_ar = merged_df_ar["Total_Amount"].sum()
+    total_ap = merged_df["Total_Amount"].sum()
+    return {
+        "merged_df": merged_df,
+        "merged_df_ar": merged_df_ar,
+        "plot_df": plot_df,
+        "pivot_df": pivot_df,
+        "week_order": week_order,
+        "ap_status_counts": results.get("ap_status_counts", _empty_status()),
+        "ar_status_counts": results.get("ar_status_counts", _empty_status()),
+        "total_ar": total_ar,
+        "total_ap": total_ap,
+        "total_cash": total_ar - total_ap,
+        "errors": errors,
+    }
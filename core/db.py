@@ -0,0 +1,258 @@
+import threading
+import time
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
+
+from core import timing
+
+# -----------------------------
+# Azure SQL settings
+# -----------------------------
+SERVER = "assetcontrol.database.windows.net"
+DRIVER = "ODBC Driver 17 for SQL Server"
+
+FINANCE_DB = "finance_project"
+GP_DB = "platform_GP"
+
+
+def odbc_connect(database, username, password):
+    """Open one raw pyodbc connection to Azure SQL (no pooling)."""
+    # import ตอนใช้จริง: pool ใช้กับ SQLite stand-in ได้โดยไม่ต้องมี ODBC driver
+    import pyodbc
+
+    return pyodbc.connect(
+        f"DRIVER={{{DRIVER}}};"
+        f"SERVER={SERVER};DATABASE={database};UID={username};PWD={password}"
+    )
+
+
+# -----------------------------
+# Connection pool
+# -----------------------------
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Process-wide pool of DB connections for one database.
+
+    Connections are handed out LIFO so the warm ones get reused and the
+    cold ones age out through idle eviction.
+    """
+
+    def __init__(self, connect, max_size=5, idle_timeout=300,
+                 health_query="SELECT 1", acquire_timeout=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_query = health_query
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = LifoQueue()
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max_size)
+        self._open = 0
+        self._metrics = {
+            "created": 0,
+            "reused": 0,
+            "evicted_idle": 0,
+            "failed_health": 0,
+            "discarded": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+        }
+
+    # ---- internal ----
+    def _bump(self, key, value=1):
+        with self._lock:
+            self._metrics[key] += value
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._open -= 1
+
+    def _healthy(self, conn):
+        if not self.health_query:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_query)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _take_idle(self):
+        """Return a healthy idle connection, or None if there isn't one."""
+        now = time.monotonic()
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except Empty:
+                return None
+            if now - last_used > self.idle_timeout:
+                self._bump("evicted_idle")
+                self._close_quietly(conn)
+                continue
+            if not self._healthy(conn):
+                self._bump("failed_health")
+                self._close_quietly(conn)
+                continue
+            return conn
+
+    # ---- public ----
+    def acquire(self, timeout=None):
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=timeout):
+            self._bump("timeouts")
+            raise PoolTimeout(f"no free connection after {timeout}s")
+        self._bump("wait_seconds", time.monotonic() - started)
+
+        try:
+            conn = self._take_idle()
+            if conn is not None:
+                self._bump("reused")
+                return conn
+            with timing.span("db.connect"):
+                conn = self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._open += 1
+            self._metrics["created"] += 1
+        return conn
+
+    def release(self, conn, broken=False):
+        try:
+            if broken:
+                self._bump("discarded")
+                self._close_quietly(conn)
+            else:
+                try:
+                    conn.rollback()  # ไม่ให้ transaction ค้างไปถึงคนถัดไป
+                except Exception:
+                    self._bump("discarded")
+                    self._close_quietly(conn)
+                else:
+                    self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            # release() rolls back; a dead connection fails that and is dropped
+            self.release(conn)
+
+    def evict_idle(self):
+        """Close idle connections older than ``idle_timeout``."""
+        keep = []
+        now = time.monotonic()
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except Empty:
+                break
+            if now - last_used > self.idle_timeout:
+                self._bump("evicted_idle")
+                self._close_quietly(conn)
+            else:
+                keep.append((conn, last_used))
+        for item in reversed(keep):
+            self._idle.put(item)
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except Empty:
+                break
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._metrics)
+            out["open"] = self._open
+        out["idle"] = self._idle.qsize()
+        out["in_use"] = out["open"] - out["idle"]
+        out["max_size"] = self.max_size
+        return out
+
+
+# -----------------------------
+# Registry: one pool per database per process
+# -----------------------------
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _connect_with_vault(database):
+    # อ่าน credential ตอน connect ทุกครั้ง (จาก cache) เผื่อ password ถูก rotate
+    from core import keyvault
+
+    username, password = keyvault.sql_credentials()
+    return odbc_connect(database, username, password)
+
+
+def get_pool(database, username=None, password=None, **pool_kwargs):
+    """The process-wide pool for ``database``, created on first use.
+
+    ``pool_kwargs`` (``max_size``, ``idle_timeout``, ...) only take effect
+    when the pool is created; asking for different settings once it exists
+    raises ValueError instead of silently handing out the other limits.
+    """
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            if username is None:
+                connect = lambda: _connect_with_vault(database)
+            else:
+                connect = lambda: odbc_connect(database, username, password)
+            pool = ConnectionPool(connect, **pool_kwargs)
+            _pools[database] = pool
+            return pool
+    mismatched = {
+        name: (getattr(pool, name), value) for name, value in pool_kwargs.items()
+        if getattr(pool, name) != value
+    }
+    if mismatched:
+        detail = ", ".join(f"{name}={have!r} (asked {want!r})" for name, (have, want) in mismatched.items())
+        raise ValueError(f"pool for {database} already exists with {detail}")
+    return pool
+
+
+def register_pool(database, pool):
+    """Install a custom pool (e.g. a SQLite stand-in for offline runs)."""
+    with _pools_lock:
+        old = _pools.get(database)
+        _pools[database] = pool
+    if old is not None and old is not pool:
+        old.close_all()
+
+
+def evict_idle():
+    """Close stale idle connections in every pool (run by the warm scheduler).
+
+    ``acquire`` only evicts from the top of the LIFO stack, so connections
+    at the bottom would otherwise stay open until the process exits.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.evict_idle()
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = dict(_pools)
+    return {name: pool.stats() for name, pool in pools.items()}
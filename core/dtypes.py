@@ -0,0 +1,120 @@
+import threading
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Column schemas
+# -----------------------------
+# category  -> ข้อความที่ค่าซ้ำกันเยอะ (ชื่อ vendor / status)
+# date      -> datetime64 จาก "YYYY-MM-DD"
+# id        -> int64 เสมอ (key / identity ห้าม downcast ไม่งั้นค่าที่เพิ่มใหม่ล้น)
+# money     -> float64 ปัดรายแถวที่ MONEY_DP ตำแหน่ง (Decimal จาก pyodbc กินที่มาก)
+#              Decimal ถูกปัดก่อนแปลงเป็น float จึงไม่มี error จากการแปลงค่ากลาง
+#
+# ตัวเลขไม่ถูก downcast: คอลัมน์จำนวนเต็มมีแค่ ID (ต้อง int64) และ GP เป็น float32 ไม่ได้ (0.0535 เพี้ยน)
+MONEY_DP = 4  # เท่า money / decimal(,4) ของ SQL Server
+
+UPLOAD_AP = {
+    "ID": "id",
+    "Vendor_No": "category",
+    "Vendor_Name": "category",
+    "original_duedate": "date",
+    "Status_": "category",
+    "amount": "money",
+}
+UPLOAD_AR = {
+    "ID": "id",
+    "Customer_No": "category",
+    "Customer_Name": "category",
+    "original_duedate": "date",
+    "Status_": "category",
+    "amount": "money",
+}
+# GP เป็นตารางเล็กที่แก้ผ่าน st.data_editor: ถ้าเป็น category editor จะให้เลือก
+# ได้เฉพาะค่าที่มีอยู่ จึงเก็บ Third_party / ITem_fees เป็นข้อความตามเดิม
+GP = {
+    "ID": "id",
+    "GP": "float",
+}
+
+
+def _to_float(series):
+    if series.dtype == object:
+        # Decimal / str -> float ทีเดียว (pd.to_numeric ไม่รู้จัก Decimal ในบาง version)
+        return pd.Series(
+            np.array([float(v) if isinstance(v, Decimal) else v for v in series], dtype=object),
+            index=series.index,
+        ).astype(float)
+    return series.astype(float)
+
+
+def _to_money(series):
+    if series.dtype == object:
+        quantum = Decimal(1).scaleb(-MONEY_DP)
+        series = pd.Series(
+            np.array([v.quantize(quantum, ROUND_HALF_UP) if isinstance(v, Decimal) else v for v in series],
+                     dtype=object),
+            index=series.index,
+        )
+    return _round_half_up(_to_float(series))
+
+
+def _round_half_up(series):
+    # ปัดครึ่งขึ้น (ห่างจาก 0) แบบ ROUND ของ SQL ไม่ใช่ half-even ของ numpy ให้ mode "sql" ได้ค่าเดียวกัน
+    # ปัด noise ของ float ออกก่อน (2.00005 เก็บเป็น 2.0000499999...) ไม่งั้นค่าที่ลงครึ่งพอดีจะปัดลง
+    scaled = (series * 10 ** MONEY_DP).round(6)
+    return np.sign(scaled) * np.floor(scaled.abs() + 0.5) / 10 ** MONEY_DP
+
+
+def _cast(series, kind):
+    if kind == "category":
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+    if kind == "date":
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        return pd.to_datetime(series, format="%Y-%m-%d", errors="coerce")
+    if kind == "id":
+        if series.isna().any():
+            return series
+        return series.astype("int64")
+    if kind == "float":
+        return _to_float(series)
+    if kind == "money":
+        return _to_money(series)
+    raise ValueError(f"unknown column kind {kind!r}")
+
+
+# -----------------------------
+# Compaction + memory report
+# -----------------------------
+_reports = {}
+_reports_lock = threading.Lock()
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def compact(df, schema, name=None):
+    """Return a copy of ``df`` with ``schema`` applied (unknown columns untouched).
+
+    When ``name`` is given the before/after sizes are kept for
+    ``memory_report()``.
+    """
+    before = frame_bytes(df)
+    out = df.copy()
+    for col, kind in schema.items():
+        if col in out.columns:
+            out[col] = _cast(out[col], kind)
+    if name:
+        after = frame_bytes(out)
+        with _reports_lock:
+            _reports[name] = {"rows": len(out), "before_mb": before / 1e6, "after_mb": after / 1e6}
+    return out
+
+
+def memory_report():
+    with _reports_lock:
+        return [dict(name=name, **r) for name, r in sorted(_reports.items())]
@@ -0,0 +1,96 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core import cache, db, dtypes
+
+GP_SQL = "SELECT * FROM GP"
+
+
+class FeeIndex:
+    """Dense shops × fee-types rate matrix built from one version of GP.
+
+    Shops and fee types keep the order they first appear in the table,
+    like the old ``unique().tolist()`` lists. Instances are shared across
+    sessions: never write to ``rates``.
+    """
+
+    def __init__(self, shops, fee_types, rates, version):
+        self.shops = list(shops)
+        self.fee_types = list(fee_types)
+        self.rates = rates
+        self.rates.setflags(write=False)
+        self.version = version
+        self._shop_pos = {s: i for i, s in enumerate(self.shops)}
+        self._fee_pos = {f: j for j, f in enumerate(self.fee_types)}
+
+    @classmethod
+    def from_gp(cls, gp_df, version=None):
+        gp = pd.DataFrame({
+            "Third_party": gp_df["Third_party"].astype(str).str.strip(),
+            "ITem_fees": gp_df["ITem_fees"].astype(str).str.strip(),
+            "GP": gp_df["GP"].astype(float),
+        })
+        shops = gp["Third_party"].unique().tolist()
+        fee_types = gp["ITem_fees"].unique().tolist()
+        # แถวซ้ำ (ร้าน + ค่าธรรมเนียมเดียวกัน) ใช้ค่าล่าสุด เหมือน dict เดิม
+        gp = gp.drop_duplicates(subset=["Third_party", "ITem_fees"], keep="last")
+        matrix = (
+            gp.pivot(index="Third_party", columns="ITem_fees", values="GP")
+            .reindex(index=shops, columns=fee_types)
+            .fillna(0.0)
+            .to_numpy(dtype=float)
+        )
+        if version is None:
+            version = table_version(gp_df)
+        return cls(shops, fee_types, matrix, version)
+
+    def matrix_for(self, shops, fee_types=None):
+        """Rates re-ordered to ``shops`` × ``fee_types`` (0 where unknown)."""
+        fee_types = self.fee_types if fee_types is None else list(fee_types)
+        rows = np.array([self._shop_pos.get(str(s).strip(), -1) for s in shops], dtype=int)
+        cols = np.array([self._fee_pos.get(f, -1) for f in fee_types], dtype=int)
+        out = np.zeros((len(rows), len(cols)))
+        ok_r, ok_c = rows >= 0, cols >= 0
+        out[np.ix_(ok_r, ok_c)] = self.rates[np.ix_(rows[ok_r], cols[ok_c])]
+        return out
+
+
+def table_version(gp_df):
+    """Content hash of the GP table; changes whenever any cell changes."""
+    hashed = pd.util.hash_pandas_object(gp_df, index=False).to_numpy()
+    return f"{len(gp_df)}-{hashlib.sha1(hashed.tobytes()).hexdigest()[:16]}"
+
+
+# -----------------------------
+# Process-wide index (rebuilt only when GP changes)
+# -----------------------------
+_current = None        # (store version of source frame, FeeIndex)
+_by_version = {}
+_lock = threading.Lock()
+
+
+def get_fee_index():
+    """FeeIndex for the current GP table, shared by every session.
+
+    GP is read through the query cache, so saving on the GP page (which
+    refreshes that cache) is what moves everyone to a new version.
+    """
+    global _current
+    gp_df = cache.read_sql(db.GP_DB, GP_SQL, snapshot=True, schema=dtypes.GP, name="GP")
+    # cache คืน view ใหม่ทุกครั้ง ใช้ store_version แทนการเทียบ identity
+    source = gp_df.attrs.get("store_version")
+    with _lock:
+        if _current is not None and source is not None and _current[0] == source:
+            return _current[1]
+    version = table_version(gp_df)
+    with _lock:
+        index = _by_version.get(version)
+        if index is None:
+            index = FeeIndex.from_gp(gp_df, version=version)
+            _by_version.clear()  # เก็บแค่ version ล่าสุด
+            _by_version[version] = index
+        _current = (source, index)
+    return index
@@ -0,0 +1,86 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+# -----------------------------
+# Settings
+# -----------------------------
+WORKERS_ENV = "FINANCE_FETCH_WORKERS"
+TIMEOUT_ENV = "FINANCE_FETCH_TIMEOUT"
+DEFAULT_TIMEOUT = 60  # วินาที ต่อ query
+
+# query / secret เป็นงานรอ network จึงใช้ thread ได้ (pyodbc ปล่อย GIL ระหว่างรอ)
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get(WORKERS_ENV, 8)),
+    thread_name_prefix="fetch",
+)
+
+
+_local = threading.local()
+
+
+class FetchTimeout(TimeoutError):
+    pass
+
+
+def _on_worker(context, loader):
+    _local.worker = True
+    try:
+        return context.run(loader)
+    finally:
+        _local.worker = False
+
+
+def default_timeout():
+    return float(os.environ.get(TIMEOUT_ENV, DEFAULT_TIMEOUT))
+
+
+def fetch_all(tasks, timeout=None, timeouts=None):
+    """Run independent loaders in parallel; returns ``(results, errors)``.
+
+    ``tasks`` maps a name to a zero-argument callable. Each task gets
+    ``timeouts[name]`` (or ``timeout``) seconds from submission; a task that
+    raises or runs late lands in ``errors`` instead of failing the others.
+    A late task cannot be interrupted -- it finishes in the background and
+    its result (e.g. a cache entry) is still kept.
+
+    Loaders run with a copy of the caller's context, so timing spans are
+    recorded in the current rerun's trace. They must not call Streamlit.
+
+    Called from inside a loader (e.g. the first pool connection fetching
+    secrets), tasks run one after another on the current thread: queueing
+    them on the same bounded pool could wait behind their own callers.
+    """
+    if getattr(_local, "worker", False):
+        return _inline(tasks)
+    timeout = default_timeout() if timeout is None else timeout
+    timeouts = timeouts or {}
+    started = time.monotonic()
+    futures = {
+        name: _executor.submit(_on_worker, contextvars.copy_context(), loader)
+        for name, loader in tasks.items()
+    }
+
+    results, errors = {}, {}
+    for name, future in futures.items():
+        limit = timeouts.get(name, timeout)
+        try:
+            results[name] = future.result(timeout=max(0.0, started + limit - time.monotonic()))
+        except FutureTimeout:
+            errors[name] = FetchTimeout(f"{name} did not finish within {limit:g}s")
+        except Exception as ex:
+            errors[name] = ex
+    return results, errors
+
+
+def _inline(tasks):
+    results, errors = {}, {}
+    for name, loader in tasks.items():
+        try:
+            results[name] = loader()
+        except Exception as ex:
+            errors[name] = ex
+    return results, errors
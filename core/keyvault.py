@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+from functools import partial
+
+from core import fetch, timing
+
+# -----------------------------
+# Settings
+# -----------------------------
+KEY_VAULT_NAME = "financeproject"
+KV_URI = f"https://{KEY_VAULT_NAME}.vault.azure.net/"
+
+DEFAULT_TTL = 3600          # วินาที ก่อน secret หมดอายุใน cache
+REFRESH_AHEAD = 0.8         # refresh เมื่อผ่านไป 80% ของ TTL
+
+# FINANCE_SECRETS_BACKEND=local  -> อ่านจาก env / ไฟล์ JSON แทน Key Vault
+BACKEND_ENV = "FINANCE_SECRETS_BACKEND"
+SECRETS_FILE_ENV = "FINANCE_SECRETS_FILE"
+TTL_ENV = "FINANCE_SECRETS_TTL"
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+class AzureKeyVaultBackend:
+    def __init__(self, vault_url=KV_URI):
+        # import ตอนใช้จริง เพื่อให้ backend local ไม่ต้องมี Azure SDK
+        from azure.identity import DefaultAzureCredential
+        from azure.keyvault.secrets import SecretClient
+
+        self._client = SecretClient(vault_url=vault_url, credential=DefaultAzureCredential())
+
+    def fetch(self, name):
+        return self._client.get_secret(name).value
+
+
+class LocalBackend:
+    """Offline stand-in: JSON file first, then environment variables.
+
+    ``SQL-Username`` is looked up as the key ``SQL-Username`` in the file
+    and as ``SQL_USERNAME`` in the environment.
+    """
+
+    def __init__(self, path=None, environ=None):
+        self.path = path
+        self.environ = os.environ if environ is None else environ
+
+    def fetch(self, name):
+        if self.path and os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if name in data:
+                return data[name]
+        env_name = name.upper().replace("-", "_")
+        if env_name in self.environ:
+            return self.environ[env_name]
+        raise KeyError(f"secret {name!r} not found (file={self.path}, env={env_name})")
+
+
+# -----------------------------
+# Cached provider
+# -----------------------------
+class SecretProvider:
+    """Fetches each secret once per process and keeps it fresh.
+
+    Values are served from memory until ``ttl`` expires. A daemon thread
+    re-fetches them after ``refresh_ahead * ttl`` so readers normally never
+    wait on the network; if a refresh fails the old value is kept until
+    it actually expires.
+    """
+
+    def __init__(self, backend, ttl=DEFAULT_TTL, refresh_ahead=REFRESH_AHEAD,
+                 background=True):
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self._values = {}            # name -> (value, fetched_at)
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+        self._stop = threading.Event()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(
+                target=self._refresh_loop, name="secret-refresh", daemon=True
+            )
+            self._thread.start()
+
+    def _fetch_lock(self, name):
+        with self._lock:
+            return self._fetch_locks.setdefault(name, threading.Lock())
+
+    def _load(self, name):
+        with timing.span("keyvault.fetch"):
+            value = self.backend.fetch(name)
+        with self._lock:
+            self._values[name] = (value, time.monotonic())
+        return value
+
+    def get(self, name):
+        with self._lock:
+            cached = self._values.get(name)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+
+        # single-flight: คนเดียวไปดึง คนอื่นรอผลเดียวกัน
+        with self._fetch_lock(name):
+            with self._lock:
+                cached = self._values.get(name)
+            if cached is not None and time.monotonic() - cached[1] < self.ttl:
+                return cached[0]
+            return self._load(name)
+
+    def get_many(self, *names):
+        """Several secrets at once; the ones not in memory are fetched in parallel
+        (one by one when called from a fetch worker, see ``fetch.fetch_all``)."""
+        now = time.monotonic()
+        with self._lock:
+            missing = [
+                n for n in names
+                if n not in self._values or now - self._values[n][1] >= self.ttl
+            ]
+        if len(missing) > 1:
+            _, errors = fetch.fetch_all({name: partial(self.get, name) for name in missing})
+            if errors:
+                raise next(iter(errors.values()))
+        return tuple(self.get(name) for name in names)
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._values.clear()
+            else:
+                self._values.pop(name, None)
+
+    def _due_for_refresh(self):
+        now = time.monotonic()
+        limit = self.ttl * self.refresh_ahead
+        with self._lock:
+            return [n for n, (_, at) in self._values.items() if now - at >= limit]
+
+    def _refresh_loop(self):
+        interval = max(1.0, self.ttl * (1 - self.refresh_ahead) / 2)
+        while not self._stop.wait(interval):
+            for name in self._due_for_refresh():
+                try:
+                    with self._fetch_lock(name):
+                        self._load(name)
+                except Exception:
+                    pass  # เก็บค่าเดิมไว้จนหมด TTL จริง
+
+    def close(self):
+        self._stop.set()
+
+
+# -----------------------------
+# Process-wide provider
+# -----------------------------
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def _default_backend():
+    if os.environ.get(BACKEND_ENV, "").lower() == "local":
+        return LocalBackend(os.environ.get(SECRETS_FILE_ENV))
+    return AzureKeyVaultBackend()
+
+
+def get_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            ttl = float(os.environ.get(TTL_ENV, DEFAULT_TTL))
+            _provider = SecretProvider(_default_backend(), ttl=ttl)
+        return _provider
+
+
+def set_provider(provider):
+    """Swap the process-wide provider (tests, benchmarks, offline runs)."""
+    global _provider
+    with _provider_lock:
+        old, _provider = _provider, provider
+    if old is not None and old is not provider:
+        old.close()
+
+
+def sql_credentials():
+    return get_provider().get_many("SQL-Username", "SQL-Password")
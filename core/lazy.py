@@ -0,0 +1,110 @@
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+from core import timing
+
+# -----------------------------
+# Import-time records (process-wide)
+# -----------------------------
+PROCESS_STARTED = datetime.now()
+_imports = {}        # module name -> {"ms", "at", "cold"}
+_imports_lock = threading.Lock()
+
+
+def load(name):
+    """Import ``name`` now and record how long the first import took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    seconds = time.perf_counter() - started
+    with _imports_lock:
+        _imports.setdefault(name, {
+            "ms": round(seconds * 1000, 1),
+            "at": datetime.now(),
+            "after_start_s": round((datetime.now() - PROCESS_STARTED).total_seconds(), 1),
+        })
+    timing.observe(f"import.{name}", seconds)
+    return module
+
+
+class LazyModule:
+    """Stands in for a module until one of its attributes is used.
+
+    ``px = lazy.module("plotly.express")`` costs nothing at import time;
+    the real import happens on the first ``px.pie(...)``, so a page that
+    stops early (not logged in) never pays for it.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        if self._module is None:
+            self.__dict__["_module"] = load(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def module(name):
+    return LazyModule(name)
+
+
+def report():
+    """First-import cost of every lazily loaded module in this process."""
+    with _imports_lock:
+        return [dict(module=name, **r) for name, r in sorted(_imports.items(), key=lambda i: -i[1]["ms"])]
+
+
+# -----------------------------
+# Cold start report (fresh interpreter per module)
+# -----------------------------
+HEAVY_MODULES = (
+    "streamlit", "pandas", "numpy", "pyarrow", "pyodbc", "bcrypt",
+    "plotly.express", "altair", "matplotlib.pyplot", "seaborn", "bokeh.plotting",
+    "pydeck", "reportlab.pdfgen.canvas", "azure.identity", "azure.keyvault.secrets",
+)
+
+
+def cold_import_ms(name, python=sys.executable):
+    """Import time of ``name`` in a new interpreter, as a new replica would see it."""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {name}; print((time.perf_counter() - t) * 1000)"
+    )
+    done = subprocess.run([python, "-c", code], capture_output=True, text=True,
+                          env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+    if done.returncode != 0:
+        return None  # ไม่ได้ติดตั้ง / import ไม่ได้
+    return float(done.stdout.strip().splitlines()[-1])
+
+
+def cold_report(modules=HEAVY_MODULES):
+    return [{"module": name, "ms": cold_import_ms(name)} for name in modules]
+
+
+if __name__ == "__main__":
+    # python -m core.lazy [module ...]
+    rows = cold_report(sys.argv[1:] or HEAVY_MODULES)
+    for row in sorted(rows, key=lambda r: -(r["ms"] or 0)):
+        ms = "not installed" if row["ms"] is None else f"{row['ms']:8.1f} ms"
+        print(f"{row['module']:28} {ms}")
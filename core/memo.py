@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Settings
+# -----------------------------
+RESULTS_ENV = "FINANCE_SCENARIO_CACHE"    # จำนวนผลลัพธ์ (DataFrame) ที่เก็บ
+FIGURES_ENV = "FINANCE_FIGURE_CACHE"      # จำนวน figure spec ที่เก็บ
+
+
+def _feed(h, part):
+    if isinstance(part, pd.DataFrame):
+        h.update(json.dumps([list(map(str, part.index)), list(map(str, part.columns))]).encode("utf-8"))
+        h.update(np.ascontiguousarray(part.to_numpy(dtype=float, na_value=np.nan)).tobytes())
+    elif isinstance(part, np.ndarray):
+        h.update(str(part.shape).encode("utf-8"))
+        h.update(np.ascontiguousarray(part, dtype=float).tobytes())
+    else:
+        h.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    h.update(b"\x00")
+
+
+def fingerprint(*parts):
+    """Stable hash of numeric frames / arrays and JSON-able values."""
+    h = hashlib.sha1()
+    for part in parts:
+        _feed(h, part)
+    return h.hexdigest()
+
+
+class LruCache:
+    """Bounded, thread-safe LRU shared by every session of the process.
+
+    Stored values are shared: DataFrames are handed out as copies so a
+    page can edit its result without touching the cached one.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _out(value):
+        return value.copy() if isinstance(value, pd.DataFrame) else value
+
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return self._out(self._values[key])
+            self.misses += 1
+        # คำนวณนอก lock (ถ้าชนกันก็แค่คำนวณซ้ำ ผลเหมือนกัน)
+        value = compute()
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+        return self._out(value)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "entries": len(self._values),
+            }
+
+
+# -----------------------------
+# Process-wide caches for the scenario page
+# -----------------------------
+results = LruCache(int(os.environ.get(RESULTS_ENV, 256)))
+figures = LruCache(int(os.environ.get(FIGURES_ENV, 512)))
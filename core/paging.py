@@ -0,0 +1,167 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 50
+
+
+# -----------------------------
+# pandas: filter / sort / slice on the server
+# -----------------------------
+def filter_frame(df, text=None, columns=None):
+    """Rows where any of ``columns`` (default: text-like ones) contains ``text``."""
+    if not text:
+        return df
+    columns = columns or [
+        c for c in df.columns
+        if pd.api.types.is_string_dtype(df[c]) or isinstance(df[c].dtype, pd.CategoricalDtype)
+    ]
+    mask = np.zeros(len(df), dtype=bool)
+    for col in columns:
+        mask |= df[col].astype(str).str.contains(text, case=False, regex=False, na=False).to_numpy()
+    return df[mask]
+
+
+def page_frame(df, page, page_size=DEFAULT_PAGE_SIZE, sort_by=None, ascending=True):
+    """One page of ``df`` in ``sort_by`` order, plus the page count.
+
+    Numeric / datetime sorts only order the rows up to the end of the
+    requested page (``argpartition``), so early pages of a big frame cost
+    O(n) instead of a full sort.
+    """
+    n = len(df)
+    pages = max(1, math.ceil(n / page_size))
+    page = min(max(page, 1), pages)
+    start, end = (page - 1) * page_size, min(page * page_size, n)
+
+    if sort_by is None or n == 0:
+        return df.iloc[start:end], pages
+
+    col = df[sort_by]
+    if pd.api.types.is_numeric_dtype(col) or pd.api.types.is_datetime64_any_dtype(col):
+        if pd.api.types.is_numeric_dtype(col):
+            values = col.to_numpy(dtype=float)
+        else:
+            values = col.to_numpy().astype("int64").astype(float)
+        values = values if ascending else -values
+        values[col.isna().to_numpy()] = np.inf  # ค่าว่างไว้ท้ายเสมอ
+        if end < n:
+            head = np.argpartition(values, end - 1)[:end]
+        else:
+            head = np.arange(n)
+        order = head[np.argsort(values[head], kind="stable")]
+        return df.iloc[order[start:end]], pages
+
+    ordered = df.sort_values(sort_by, ascending=ascending, na_position="last", kind="stable")
+    return ordered.iloc[start:end], pages
+
+
+# -----------------------------
+# Streamlit components
+# -----------------------------
+def _controls(st, df, key, page_size):
+    c1, c2, c3, c4 = st.columns([3, 2, 1, 1])
+    with c1:
+        text = st.text_input("ค้นหา", key=f"{key}_q", placeholder="filter…")
+    with c2:
+        sort_by = st.selectbox("เรียงตาม", [None] + list(df.columns), key=f"{key}_sort")
+    with c3:
+        ascending = st.toggle("น้อย → มาก", value=True, key=f"{key}_asc")
+    view = filter_frame(df, text)
+    pages = max(1, math.ceil(len(view) / page_size))
+    with c4:
+        page = st.number_input("หน้า", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    return view, sort_by, ascending, int(page)
+
+
+def paged_table(st, df, key, page_size=DEFAULT_PAGE_SIZE, **dataframe_kwargs):
+    """``st.dataframe`` that only sends the visible page to the browser."""
+    view, sort_by, ascending, page = _controls(st, df, key, page_size)
+    rows, pages = page_frame(view, page, page_size, sort_by, ascending)
+    st.dataframe(rows, **dataframe_kwargs)
+    st.caption(f"หน้า {page}/{pages} · {len(view):,} จาก {len(df):,} แถว")
+    return rows
+
+
+def _has_edits(state):
+    return bool(state) and any(state.get(k) for k in ("edited_rows", "added_rows", "deleted_rows"))
+
+
+def _apply_edits(page_df, state):
+    """``page_df`` with a ``st.data_editor`` widget state (edited/added/deleted rows) applied."""
+    out = page_df.copy()
+    for pos, changes in (state.get("edited_rows") or {}).items():
+        for col, value in changes.items():
+            if col in out.columns:
+                out.iloc[int(pos), out.columns.get_loc(col)] = value
+    deleted = [int(pos) for pos in state.get("deleted_rows") or []]
+    if deleted:
+        out = out.drop(index=out.index[deleted])
+    added = [{c: row.get(c) for c in out.columns} for row in state.get("added_rows") or []]
+    if added:
+        out = pd.concat([out, pd.DataFrame(added, columns=out.columns)])
+    return out
+
+
+def _page(frame, page, page_size):
+    return frame.iloc[(page - 1) * page_size:page * page_size]
+
+
+def _splice(frame, page, page_size, part):
+    start, end = (page - 1) * page_size, page * page_size
+    return pd.concat([frame.iloc[:start], part, frame.iloc[end:]])
+
+
+def paged_editor(st, df, key, page_size=DEFAULT_PAGE_SIZE, **editor_kwargs):
+    """``st.data_editor`` over one page at a time; returns the full edited frame.
+
+    The editor of a page keeps the same widget key while the page is shown,
+    so its edits accumulate in the widget. On a page change they are folded
+    into ``st.session_state[key + '_draft']`` (from the widget's
+    edited/added/deleted rows) and the next editor starts from that draft.
+    The frame the edits started from is kept as the base; diff against
+    ``editor_base(st, key, df)``, not a newer ``df``. Call
+    ``reset_editor(st, key)`` after saving.
+    """
+    draft_key, version_key, base_key, shown_key = (
+        f"{key}_draft", f"{key}_version", f"{key}_base", f"{key}_shown")
+    version = st.session_state.get(version_key, 0)
+    draft = st.session_state.get(draft_key)
+    shown = st.session_state.get(shown_key)
+    # state ของ editor หน้าที่แสดงรอบก่อน (ยังอยู่ใน session_state จนจบรอบนี้)
+    shown_state = st.session_state.get(f"{key}_{shown}_{version}") if shown is not None else None
+    if draft is None and not _has_edits(shown_state):
+        # ยังไม่มีการแก้ -> เริ่มจากข้อมูลล่าสุด และจำไว้เป็น base
+        st.session_state[base_key] = df
+    if draft is None:
+        draft = st.session_state[base_key]
+
+    pages = max(1, math.ceil(len(draft) / page_size))
+    page = int(st.number_input("หน้า", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page"))
+    if shown is not None and shown != page:
+        # เปลี่ยนหน้า: รวม edits ของหน้าเดิมเข้า draft แล้วใช้ key ใหม่ (editor เริ่มจาก draft)
+        if _has_edits(shown_state):
+            part = _apply_edits(_page(draft, shown, page_size), shown_state)
+            draft = _splice(draft, shown, page_size, part)
+            st.session_state[draft_key] = draft
+        version += 1
+        st.session_state[version_key] = version
+    st.session_state[shown_key] = page
+
+    edited = st.data_editor(_page(draft, page, page_size), key=f"{key}_{page}_{version}", **editor_kwargs)
+    st.caption(f"หน้า {page}/{pages} · {len(draft):,} แถว")
+    return _splice(draft, page, page_size, edited)
+
+
+def editor_base(st, key, df):
+    """The frame the current edits started from (``df`` before the first run)."""
+    base = st.session_state.get(f"{key}_base")
+    return df if base is None else base
+
+
+def reset_editor(st, key):
+    st.session_state.pop(f"{key}_draft", None)
+    st.session_state.pop(f"{key}_base", None)
+    st.session_state.pop(f"{key}_shown", None)
+    st.session_state[f"{key}_version"] = st.session_state.get(f"{key}_version", 0) + 1
@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Row names used by the Scenario table
+# -----------------------------
+PRICE_ROW = "ราคาขาย (รวม Vat7%)"
+DISCOUNT_ROW = "ส่วนลดจากร้านค้า"
+NET_ROW = "ราคาขายหลังหักส่วนลด"
+CODE_ROW = "ใช้โค้ดส่วนลด"
+BUYER_SHIP_ROW = "ค่าจัดส่งที่ชำระโดยผู้ซื้อ"
+ACTUAL_SHIP_ROW = "ค่าส่งตามจริง (ขนส่ง)"
+BUYER_ROW = "ยอดชำระผู้ซื้อ"
+TOTAL_FEE_ROW = "ค่าธรรมเนียมรวม"
+REVENUE_ROW = "ยอดเงินบริษัทได้รับ"
+
+# ลำดับ column ของ input matrix (shops × INPUT_ROWS)
+INPUT_ROWS = [PRICE_ROW, DISCOUNT_ROW, CODE_ROW, BUYER_SHIP_ROW, ACTUAL_SHIP_ROW]
+
+TOTAL_FEE_TYPES = [
+    "ค่าคอมมิชชัน",
+    "ค่าธรรมเนียมขนส่ง Shipping extra",
+    "ค่าธรรมเนียมการชำระเงิน",
+    "ค่าธรรมเนียม Affiliate (10%) +Vat7%",
+]
+
+
+def table_rows(fee_types):
+    return [
+        PRICE_ROW, DISCOUNT_ROW, NET_ROW, CODE_ROW,
+        BUYER_SHIP_ROW, ACTUAL_SHIP_ROW, BUYER_ROW,
+    ] + list(fee_types) + [TOTAL_FEE_ROW, REVENUE_ROW]
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def round2(values):
+    """``round(x, 2)`` for a whole array, matching Python's result exactly.
+
+    ``np.round`` scales by 100 and can land on the other side of a .5 tie
+    than Python's correctly-rounded ``round``; the few values close to a
+    tie are re-rounded with ``round`` so results stay bit-identical.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        out[near_tie] = [round(float(v), 2) for v in values[near_tie]]
+    return out
+
+
+def rate_matrix(fees, shops, fee_types):
+    """Nested ``{shop: {fee_type: rate}}`` -> shops × fee_types array."""
+    rates = np.zeros((len(shops), len(fee_types)))
+    for i, shop in enumerate(shops):
+        shop_fees = fees.get(str(shop).strip(), {})
+        for j, fee_type in enumerate(fee_types):
+            rates[i, j] = shop_fees.get(fee_type, 0)
+    return rates
+
+
+# -----------------------------
+# Engine
+# -----------------------------
+def compute(inputs, rates, fee_types, extra_fees=None):
+    """Price every shop at once.
+
+    ``inputs`` is shops × INPUT_ROWS, ``rates`` is shops × fee_types (any
+    leading batch dimensions are allowed on ``inputs`` as long as they
+    broadcast against ``rates``). ``extra_fees`` maps a TOTAL_FEE_TYPES
+    name that is not a computed fee type to its current per-shop values.
+    """
+    inputs = np.asarray(inputs, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    price, discount, code, buyer_ship, actual_ship = np.moveaxis(inputs, -1, 0)
+
+    net = price - discount
+    buyer = net - code - buyer_ship - actual_ship
+    fee_values = round2(buyer[..., None] * rates)
+
+    # บวกตามลำดับ TOTAL_FEE_TYPES ทีละตัว ให้ผลเท่ากับ sum() เดิมทุก bit
+    index = {ft: j for j, ft in enumerate(fee_types)}
+    total = np.zeros_like(buyer)
+    for ft in TOTAL_FEE_TYPES:
+        if ft in index:
+            total = total + fee_values[..., index[ft]]
+        elif extra_fees and ft in extra_fees:
+            total = total + np.asarray(extra_fees[ft], dtype=float)
+
+    return {
+        "net": net,
+        "buyer": buyer,
+        "fees": fee_values,
+        "total_fee": round2(total),
+        "revenue": round2(buyer - total),
+    }
+
+
+def extra_fees(df, fee_types):
+    """TOTAL_FEE_TYPES rows of ``df`` that are not computed from a rate."""
+    return {
+        ft: df.loc[ft].to_numpy(dtype=float)
+        for ft in TOTAL_FEE_TYPES
+        if ft not in fee_types and ft in df.index
+    }
+
+
+def update_all(df, fees, fee_types):
+    """Vectorized drop-in for the old per-shop ``update_all`` loop.
+
+    ``fees`` is either the nested fee dict or a precomputed rate matrix
+    aligned with ``df.columns`` × ``fee_types``.
+    """
+    shops = list(df.columns)
+    rates = fees if isinstance(fees, np.ndarray) else rate_matrix(fees, shops, fee_types)
+    inputs = df.loc[INPUT_ROWS].to_numpy(dtype=float).T
+
+    out = compute(inputs, rates, fee_types, extra_fees=extra_fees(df, fee_types))
+
+    df.loc[NET_ROW] = out["net"]
+    df.loc[BUYER_ROW] = out["buyer"]
+    for j, fee_type in enumerate(fee_types):
+        df.loc[fee_type] = out["fees"][:, j]
+    df.loc[TOTAL_FEE_ROW] = out["total_fee"]
+    df.loc[REVENUE_ROW] = out["revenue"]
+    return df
+
+
+def empty_table(price, shops, fee_types):
+    """Starting Scenario table: every shop sells at ``price`` with no extras."""
+    rows = table_rows(fee_types)
+    df = pd.DataFrame(0.0, index=rows, columns=shops)
+    df.loc[PRICE_ROW] = float(price)
+    df.loc[NET_ROW] = float(price)
+    return df
+
+
+# -----------------------------
+# Price-sensitivity sweep
+# -----------------------------
+SWEEP_AXES = [PRICE_ROW, DISCOUNT_ROW, CODE_ROW, BUYER_SHIP_ROW]
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def sweep(base_inputs, rates, fee_types, prices, discounts=(0.0,),
+          code_discounts=(0.0,), shipping=(0.0,), max_chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Evaluate every price × discount × code-discount × shipping combination.
+
+    ``base_inputs`` is the shops × INPUT_ROWS table the grid is applied to
+    (actual shipping cost stays per shop). The grid is processed in chunks
+    so the per-fee temporary (chunk × shops × fee_types) stays under
+    ``max_chunk_bytes``.
+
+    Returns ``grid`` (G × 4, columns in SWEEP_AXES order) and G × shops
+    arrays ``buyer``, ``total_fee`` and ``revenue``.
+    """
+    base_inputs = np.asarray(base_inputs, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    n_shops = base_inputs.shape[0]
+
+    axes = [np.asarray(a, dtype=float).ravel() for a in (prices, discounts, code_discounts, shipping)]
+    grid = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 4)
+    n = len(grid)
+
+    row_bytes = max(1, n_shops * (len(fee_types) + len(INPUT_ROWS) + 4) * 8)
+    chunk = max(1, int(max_chunk_bytes // row_bytes))
+
+    out = {
+        "grid": grid,
+        "buyer": np.empty((n, n_shops)),
+        "total_fee": np.empty((n, n_shops)),
+        "revenue": np.empty((n, n_shops)),
+    }
+    # ตำแหน่งใน INPUT_ROWS ของแต่ละแกนที่ sweep
+    cols = [INPUT_ROWS.index(row) for row in SWEEP_AXES]
+    for start in range(0, n, chunk):
+        part = grid[start:start + chunk]
+        inputs = np.broadcast_to(base_inputs, (len(part), n_shops, len(INPUT_ROWS))).copy()
+        inputs[:, :, cols] = part[:, None, :]
+        res = compute(inputs, rates, fee_types)
+        out["buyer"][start:start + chunk] = res["buyer"]
+        out["total_fee"][start:start + chunk] = res["total_fee"]
+        out["revenue"][start:start + chunk] = res["revenue"]
+    return out
+
+
+def sweep_frame(result, shops):
+    """Long DataFrame (one row per grid point × shop) for charting."""
+    grid = result["grid"]
+    n, n_shops = result["revenue"].shape
+    frame = pd.DataFrame(np.repeat(grid, n_shops, axis=0), columns=SWEEP_AXES)
+    frame["shop"] = np.tile(np.asarray(shops, dtype=object), n)
+    frame[TOTAL_FEE_ROW] = result["total_fee"].ravel()
+    frame[REVENUE_ROW] = result["revenue"].ravel()
+    return frame
+
+
+def break_even(result, shops, target=0.0):
+    """Lowest swept price per shop whose revenue reaches ``target``.
+
+    Only grid points are considered (no interpolation); NaN when no price
+    in the grid gets there.
+    """
+    price = result["grid"][:, 0]
+    reached = result["revenue"] >= target
+    out = {}
+    for i, shop in enumerate(shops):
+        hits = price[reached[:, i]]
+        out[shop] = float(hits.min()) if len(hits) else float("nan")
+    return pd.Series(out, name="break_even_price")
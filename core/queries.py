@@ -0,0 +1,304 @@
+import os
+import threading
+
+import pandas as pd
+
+from core import cache, db, dtypes, stream
+from core.sync import TableSync
+
+# -----------------------------
+# Upload table specs
+# -----------------------------
+AP = {
+    "database": db.FINANCE_DB,
+    "table": "Cash_AP_Upload",
+    "keys": ["Vendor_No", "Vendor_Name", "original_duedate", "Status_"],
+    "value": "amount",
+    "schema": dtypes.UPLOAD_AP,
+    "party": "Vendor_No",
+    # ใช้ใน mode "sync": identity ID เป็นทั้ง key และ watermark
+    # -> ระหว่างรอบ reconcile ดึงได้เฉพาะแถวที่ insert ใหม่ แถวที่ถูกแก้/ลบจะเห็นตอน reconcile
+    # ถ้าตารางมีคอลัมน์ rowversion / Modified_at ให้ใช้เป็น watermark แทน (Modified_at ต้อง "inclusive": True)
+    "id": "ID",
+    "watermark": "ID",
+    "inclusive": False,
+}
+AR = {
+    "database": db.FINANCE_DB,
+    "table": "Cash_AR_Upload",
+    "keys": ["Customer_No", "Customer_Name", "original_duedate", "Status_"],
+    "value": "amount",
+    "schema": dtypes.UPLOAD_AR,
+    "party": "Customer_No",
+    # ใช้ใน mode "sync": identity ID เป็นทั้ง key และ watermark
+    # -> ระหว่างรอบ reconcile ดึงได้เฉพาะแถวที่ insert ใหม่ แถวที่ถูกแก้/ลบจะเห็นตอน reconcile
+    # ถ้าตารางมีคอลัมน์ rowversion / Modified_at ให้ใช้เป็น watermark แทน (Modified_at ต้อง "inclusive": True)
+    "id": "ID",
+    "watermark": "ID",
+    "inclusive": False,
+}
+
+# "sql"    -> GROUP BY / COUNT ทำบน server ส่งกลับเฉพาะแถวที่สรุปแล้ว
+# "pandas" -> SELECT * แล้ว groupby ใน pandas (สำหรับ backend อื่น)
+# "sync"   -> เก็บตารางไว้ในหน่วยความจำ ดึงเฉพาะแถวใหม่ตาม watermark (แถวที่แก้ไขรอ reconcile)
+# "stream" -> SELECT * ทีละ chunk แล้วสะสมผลรวม ไม่ถือตารางดิบทั้งก้อน
+MODE_ENV = "FINANCE_AGG_MODE"
+
+
+def default_mode():
+    return os.environ.get(MODE_ENV, "sql").lower()
+
+
+def _cols(names):
+    return ", ".join(f"[{n}]" for n in names)
+
+
+# -----------------------------
+# Filters (due-date range, vendor / customer, status)
+# -----------------------------
+DATE_COL = "original_duedate"
+
+
+def _day(value):
+    return None if value is None or value == "" else pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def make_filters(date_from=None, date_to=None, parties=None, statuses=None):
+    """Normalized filters, or None when nothing is filtered.
+
+    Equal filters always give the same dict (ISO dates, sorted unique
+    values), so they give the same SQL + params and share a cache entry.
+    """
+    filters = {
+        "date_from": _day(date_from),
+        "date_to": _day(date_to),
+        "parties": tuple(sorted({str(p) for p in parties or ()})),
+        "statuses": tuple(sorted({str(s) for s in statuses or ()})),
+    }
+    return filters if any(filters.values()) else None
+
+
+def where_sql(spec, filters, status_col="Status_"):
+    """``(where, params)`` for ``filters``; ``where`` is None when unfiltered."""
+    if not filters:
+        return None, ()
+    clauses, params = [], []
+    if filters["date_from"]:
+        clauses.append(f"[{DATE_COL}] >= ?")
+        params.append(filters["date_from"])
+    if filters["date_to"]:
+        clauses.append(f"[{DATE_COL}] <= ?")
+        params.append(filters["date_to"])
+    for col, values in ((spec["party"], filters["parties"]), (status_col, filters["statuses"])):
+        if values:
+            clauses.append(f"[{col}] IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    return " AND ".join(clauses), tuple(params)
+
+
+def apply_filters(df, spec, filters, status_col="Status_"):
+    """Same rows as ``where_sql`` but on a frame already in memory."""
+    if not filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    dates = pd.to_datetime(df[DATE_COL], format="%Y-%m-%d", errors="coerce")
+    if filters["date_from"]:
+        mask &= dates >= pd.Timestamp(filters["date_from"])
+    if filters["date_to"]:
+        mask &= dates <= pd.Timestamp(filters["date_to"])
+    for col, values in ((spec["party"], filters["parties"]), (status_col, filters["statuses"])):
+        if values:
+            mask &= df[col].astype(str).isin(values) & df[col].notna()
+    return df[mask]
+
+
+def index_sql(spec, dialect="mssql", status_col="Status_"):
+    """Recommended indexes for the dashboard filters on ``spec``'s table.
+
+    One per filter column, leading with that column; on SQL Server the
+    remaining query columns are INCLUDEd so filtered GROUP BYs never touch
+    the base table.
+    """
+    table = spec["table"]
+    name_col = next(k for k in spec["keys"] if k not in (spec["party"], DATE_COL, status_col))
+    covered = [spec["party"], name_col, DATE_COL, status_col, spec["value"]]
+    statements = []
+    for suffix, lead in (("duedate", [DATE_COL]), ("party", [spec["party"], DATE_COL]),
+                         ("status", [status_col, DATE_COL])):
+        name = f"IX_{table}_{suffix}"
+        if dialect == "mssql":
+            include = [c for c in covered if c not in lead]
+            statements.append(
+                f"CREATE NONCLUSTERED INDEX [{name}] ON [{table}] ({_cols(lead)}) INCLUDE ({_cols(include)})"
+            )
+        else:
+            statements.append(f"CREATE INDEX IF NOT EXISTS [{name}] ON [{table}] ({_cols(lead)})")
+    return statements
+
+
+# -----------------------------
+# SQL builders
+# -----------------------------
+def select_all_sql(spec, where=None):
+    sql = f"SELECT * FROM [{spec['table']}]"
+    return sql + f" WHERE {where}" if where else sql
+
+
+def grouped_sum_sql(spec, where=None):
+    keys = _cols(spec["keys"])
+    # pandas groupby ทิ้งแถวที่ key เป็น NULL และให้ 0 กับ group ที่ amount เป็น NULL ทั้งหมด
+    # -> ทำแบบเดียวกันเพื่อให้ผลตรงกัน; ปัดรายแถวที่ MONEY_DP ตำแหน่งเหมือน dtypes "money"
+    conditions = " AND ".join(f"[{k}] IS NOT NULL" for k in spec["keys"])
+    if where:
+        conditions += f" AND {where}"
+    return (
+        f"SELECT {keys}, COALESCE(SUM(ROUND([{spec['value']}], {dtypes.MONEY_DP})), 0) AS [{spec['value']}] "
+        f"FROM [{spec['table']}] WHERE {conditions} GROUP BY {keys} ORDER BY {keys}"
+    )
+
+
+def status_count_sql(spec, status_col="Status_", where=None):
+    filtered = f" WHERE {where}" if where else ""
+    return (
+        f"SELECT [{status_col}], COUNT(*) AS [count] "
+        f"FROM [{spec['table']}]{filtered} GROUP BY [{status_col}] ORDER BY [{status_col}]"
+    )
+
+
+# -----------------------------
+# Incremental sync (one TableSync per table per process)
+# -----------------------------
+_syncers = {}
+_syncers_lock = threading.Lock()
+
+
+def get_syncer(spec):
+    with _syncers_lock:
+        syncer = _syncers.get(spec["table"])
+        if syncer is None:
+            syncer = TableSync(
+                spec["table"], spec["keys"], spec["value"],
+                id_col=spec["id"], watermark_col=spec["watermark"], inclusive=spec["inclusive"],
+                connection=db.get_pool(spec["database"]).connection, schema=spec["schema"],
+            )
+            _syncers[spec["table"]] = syncer
+    return syncer.maybe_sync()
+
+
+def refresh(*specs):
+    """Drop cached results and force a full reconcile for ``specs``."""
+    for spec in specs:
+        cache.refresh(spec["table"])
+        with _syncers_lock:
+            syncer = _syncers.get(spec["table"])
+        if syncer is not None:
+            syncer.reset()
+
+
+# -----------------------------
+# Streaming (one pass fills both grouped sums and status counts)
+# -----------------------------
+_fold_locks = {}
+_fold_locks_lock = threading.Lock()
+
+
+def _fold_lock(key):
+    with _fold_locks_lock:
+        return _fold_locks.setdefault(key, threading.Lock())
+
+
+def _streamed(spec, part, status_col="Status_", filters=None):
+    where, params = where_sql(spec, filters, status_col)
+    sql = select_all_sql(spec, where)
+    keys = {
+        p: cache.QueryCache.make_key(spec["database"], sql, (*params, "stream", p, status_col))
+        for p in ("grouped", "status")
+    }
+
+    def loader():
+        agg = stream.aggregate(spec, sql, params=params, status_col=status_col)
+        frames = {"grouped": agg.grouped(), "status": agg.status()}
+        other = "status" if part == "grouped" else "grouped"
+        cache.query_cache.put(keys[other], frames[other])
+        return frames[part]
+
+    # dashboard ขอ grouped กับ status พร้อมกัน (fetch_all) -> lock เดียวต่อ query
+    # คนแรก stream ครั้งเดียวเติมทั้งสองส่วน คนที่สองรอแล้วได้ผลจาก cache
+    with _fold_lock(cache.QueryCache.make_key(spec["database"], sql, (*params, status_col))):
+        return cache.query_cache.get(keys[part], loader)
+
+
+def _raw(spec, mode, filters=None, status_col="Status_"):
+    """Whole table in memory (pandas / sync modes), with ``filters`` applied."""
+    if mode == "sync":
+        raw = get_syncer(spec).frame
+    else:
+        raw = cache.read_sql(
+            spec["database"], select_all_sql(spec), snapshot=True,
+            schema=spec["schema"], name=spec["table"],
+        )
+    return apply_filters(raw, spec, filters, status_col)
+
+
+# -----------------------------
+# Aggregates
+# -----------------------------
+# filters (ดู make_filters) ใน mode sql / stream ถูกส่งเป็น WHERE + params ไปที่ DB
+# ผลของแต่ละชุด filter ถูก cache แยกกัน (key = SQL + params ที่ normalize แล้ว)
+def grouped_sum(spec, amount_name, mode=None, filters=None):
+    """Sum of ``value`` per key group, renamed to ``amount_name``."""
+    mode = mode or default_mode()
+    if mode == "sql":
+        where, params = where_sql(spec, filters)
+        out = cache.read_sql(
+            spec["database"], grouped_sum_sql(spec, where), params, snapshot=where is None,
+            schema=spec["schema"], name=f"{spec['table']} (grouped{', filtered' if where else ''})",
+        )
+    elif mode == "sync" and not filters:
+        out = get_syncer(spec).grouped_sum()
+    elif mode == "stream":
+        out = _streamed(spec, "grouped", filters=filters)
+    else:
+        raw = _raw(spec, mode, filters)
+        out = raw.groupby(spec["keys"], as_index=False, observed=True)[spec["value"]].sum()
+    # ทุก mode บวกแถวที่ปัดแล้วที่ MONEY_DP ตำแหน่ง (dtypes "money" / ROUND ใน SQL / stream fixed-point)
+    # ผลรวมจึงเป็นค่าเดียวกัน ปัดที่ตำแหน่งเดิมแค่ล้าง error ของ float (ไม่ปัดเป็น 2 ตำแหน่งต่อ group)
+    out = out.assign(**{spec["value"]: out[spec["value"]].round(dtypes.MONEY_DP)})
+    return out.rename(columns={spec["value"]: amount_name})
+
+
+def status_counts(spec, status_col="Status_", mode=None, filters=None):
+    """Row count and percentage of all (filtered) rows per status."""
+    mode = mode or default_mode()
+    if mode == "sql":
+        where, params = where_sql(spec, filters, status_col)
+        counts = cache.read_sql(
+            spec["database"], status_count_sql(spec, status_col, where), params, snapshot=where is None,
+            schema=spec["schema"], name=f"{spec['table']} (status{', filtered' if where else ''})",
+        )
+        total = int(counts["count"].sum())  # รวมแถวที่ status เป็น NULL ด้วย
+        counts = counts[counts[status_col].notna()].reset_index(drop=True)
+    elif mode == "sync" and not filters:
+        counts, total = get_syncer(spec).status_counts()
+    elif mode == "stream":
+        counts = _streamed(spec, "status", status_col, filters)
+        total = int(counts["count"].sum())
+        counts = counts[counts[status_col].notna()].reset_index(drop=True)
+    else:
+        raw = _raw(spec, mode, filters, status_col)
+        counts = raw.groupby(status_col, observed=True).size().reset_index(name="count")
+        total = raw.shape[0]
+
+    counts = counts.copy()
+    if total > 0:
+        counts["percentage"] = (counts["count"] / total) * 100
+    else:
+        counts["percentage"] = 0
+    return counts
+
+
+def distinct_values(spec, column):
+    """Sorted distinct non-NULL values of ``column`` (for filter pickers)."""
+    sql = f"SELECT DISTINCT [{column}] FROM [{spec['table']}] WHERE [{column}] IS NOT NULL ORDER BY [{column}]"
+    df = cache.read_sql(spec["database"], sql, snapshot=True)
+    return df[column].astype(str).tolist()
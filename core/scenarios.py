@@ -0,0 +1,181 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from core import pricing
+
+# -----------------------------
+# Rule format
+# -----------------------------
+# แต่ละ rule เป็น dict: {"type", "value", "shop" (ว่าง = ทุกร้าน), "target"}
+#   discount_pct   ส่วนลดจากร้านค้า = ราคาขาย × value
+#   shipping       ค่าจัดส่งที่ชำระโดยผู้ซื้อ = value
+#   code_discount  ใช้โค้ดส่วนลด = value (บาท)
+#   set            แถว input ``target`` = value (ใช้ทำ override รายร้าน)
+#   fee_rate       อัตราค่าธรรมเนียม ``target`` = value
+# rule ถูกใช้ตามลำดับ ตัวหลังทับตัวก่อนในช่องเดียวกัน
+RULE_TYPES = ["discount_pct", "shipping", "code_discount", "set", "fee_rate"]
+RULE_COLUMNS = ["type", "shop", "target", "value"]
+
+_FIXED_ROWS = {"shipping": pricing.BUYER_SHIP_ROW, "code_discount": pricing.CODE_ROW}
+_PRICE = pricing.INPUT_ROWS.index(pricing.PRICE_ROW)
+_DISCOUNT = pricing.INPUT_ROWS.index(pricing.DISCOUNT_ROW)
+
+
+def default_rules(name):
+    """Rules implied by a scenario's name (the page's original behaviour)."""
+    if name.lower().find("ลด") >= 0:
+        return [{"type": "discount_pct", "shop": None, "target": None, "value": 0.10}]
+    if name.lower().find("ส่งฟรี") >= 0:
+        return [{"type": "shipping", "shop": None, "target": None, "value": 0.0}]
+    return []
+
+
+def rules_frame(rules):
+    """Rules as a table for ``st.data_editor`` (one row per rule)."""
+    return pd.DataFrame(rules, columns=RULE_COLUMNS).astype({"value": float})
+
+
+def _blank(value):
+    return value is None or (isinstance(value, float) and np.isnan(value)) or str(value).strip() == ""
+
+
+def validate(rules, shops, fee_types):
+    """``(clean_rules, errors)``; rows with every field blank are skipped."""
+    clean, errors = [], []
+    shops = [str(s) for s in shops]
+    for i, rule in enumerate(rules, start=1):
+        if all(_blank(rule.get(col)) for col in RULE_COLUMNS):
+            continue
+        kind = rule.get("type")
+        shop = None if _blank(rule.get("shop")) else str(rule["shop"]).strip()
+        target = None if _blank(rule.get("target")) else str(rule["target"]).strip()
+        try:
+            value = float(rule.get("value"))
+        except (TypeError, ValueError):
+            errors.append(f"rule {i}: value ต้องเป็นตัวเลข")
+            continue
+        if not math.isfinite(value):
+            # ช่อง value ที่ถูกลบใน data_editor กลายเป็น NaN -> ทั้ง scenario จะเป็น NaN
+            errors.append(f"rule {i}: value ต้องเป็นตัวเลข")
+            continue
+        if kind not in RULE_TYPES:
+            errors.append(f"rule {i}: ไม่รู้จัก type {kind!r}")
+        elif shop is not None and shop not in shops:
+            errors.append(f"rule {i}: ไม่มีร้าน {shop!r}")
+        elif kind == "set" and target not in pricing.INPUT_ROWS:
+            errors.append(f"rule {i}: set ต้องระบุ target เป็นแถว input")
+        elif kind == "fee_rate" and target not in fee_types:
+            errors.append(f"rule {i}: fee_rate ต้องระบุ target เป็นค่าธรรมเนียม")
+        else:
+            clean.append({"type": kind, "shop": shop, "target": target, "value": value})
+    return clean, errors
+
+
+# -----------------------------
+# Compile: rules -> dense masks over scenarios × shops × (inputs | fees)
+# -----------------------------
+class Compiled:
+    """Every scenario's rules as arrays, ready for one batched evaluation."""
+
+    def __init__(self, names, shops, fee_types):
+        s, n = len(names), len(shops)
+        self.names = list(names)
+        self.shops = list(shops)
+        self.fee_types = list(fee_types)
+        self.set_mask = np.zeros((s, n, len(pricing.INPUT_ROWS)), dtype=bool)
+        self.set_value = np.zeros((s, n, len(pricing.INPUT_ROWS)))
+        self.pct_mask = np.zeros((s, n), dtype=bool)
+        self.pct = np.zeros((s, n))
+        self.rate_mask = np.zeros((s, n, len(fee_types)), dtype=bool)
+        self.rate_value = np.zeros((s, n, len(fee_types)))
+
+
+def compile_rules(scenario_rules, shops, fee_types):
+    """``{name: [rule, ...]}`` (already validated) -> Compiled."""
+    compiled = Compiled(scenario_rules, shops, fee_types)
+    shop_pos = {str(shop): i for i, shop in enumerate(shops)}
+    for s, rules in enumerate(scenario_rules.values()):
+        for rule in rules:
+            cols = slice(None) if rule["shop"] is None else shop_pos[rule["shop"]]
+            kind, value = rule["type"], rule["value"]
+            if kind == "discount_pct":
+                compiled.pct_mask[s, cols] = True
+                compiled.pct[s, cols] = value
+                compiled.set_mask[s, cols, _DISCOUNT] = False
+            elif kind == "fee_rate":
+                j = compiled.fee_types.index(rule["target"])
+                compiled.rate_mask[s, cols, j] = True
+                compiled.rate_value[s, cols, j] = value
+            else:
+                row = rule["target"] if kind == "set" else _FIXED_ROWS[kind]
+                k = pricing.INPUT_ROWS.index(row)
+                compiled.set_mask[s, cols, k] = True
+                compiled.set_value[s, cols, k] = value
+                if k == _DISCOUNT:
+                    compiled.pct_mask[s, cols] = False
+    return compiled
+
+
+def evaluate(compiled, base_inputs, base_rates, extra_fees=None):
+    """Price every scenario × shop in one ``pricing.compute`` call.
+
+    ``base_inputs`` is shops × INPUT_ROWS, ``base_rates`` shops × fee_types.
+    Returns the ``compute`` output with a leading scenario axis plus the
+    scenario ``inputs`` and ``rates`` actually used.
+    """
+    base_inputs = np.asarray(base_inputs, dtype=float)
+    base_rates = np.asarray(base_rates, dtype=float)
+    inputs = np.where(compiled.set_mask, compiled.set_value, base_inputs)
+    # ส่วนลด % คิดจากราคาขายหลัง set แล้ว
+    inputs[..., _DISCOUNT] = np.where(compiled.pct_mask, inputs[..., _PRICE] * compiled.pct, inputs[..., _DISCOUNT])
+    rates = np.where(compiled.rate_mask, compiled.rate_value, base_rates)
+    out = pricing.compute(inputs, rates, compiled.fee_types, extra_fees=extra_fees)
+    out["inputs"] = inputs
+    out["rates"] = rates
+    out["fee_types"] = compiled.fee_types
+    return out
+
+
+def to_frame(result, s, base_df):
+    """Scenario ``s`` of ``evaluate`` as a table shaped like ``base_df``."""
+    df = base_df.copy()
+    df.loc[pricing.INPUT_ROWS] = result["inputs"][s].T
+    df.loc[pricing.NET_ROW] = result["net"][s]
+    df.loc[pricing.BUYER_ROW] = result["buyer"][s]
+    for j, fee_type in enumerate(result["fee_types"]):
+        df.loc[fee_type] = result["fees"][s, :, j]
+    df.loc[pricing.TOTAL_FEE_ROW] = result["total_fee"][s]
+    df.loc[pricing.REVENUE_ROW] = result["revenue"][s]
+    return df
+
+
+# -----------------------------
+# Comparison
+# -----------------------------
+def delta_table(names, shops, revenue, base_revenue, total_fee=None):
+    """Scenarios side by side: revenue per shop and its change vs. the base.
+
+    ``revenue`` / ``total_fee`` are scenarios × shops, ``base_revenue``
+    is per shop. Columns are (metric, shop) plus a "รวม" total per metric.
+    """
+    revenue = np.asarray(revenue, dtype=float)
+    base_revenue = np.asarray(base_revenue, dtype=float)
+    delta = revenue - base_revenue
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(base_revenue != 0, delta / np.abs(base_revenue) * 100, np.nan)
+
+    blocks = {pricing.REVENUE_ROW: revenue, "Δ ยอดเงินบริษัทได้รับ": delta}
+    if total_fee is not None:
+        blocks[pricing.TOTAL_FEE_ROW] = np.asarray(total_fee, dtype=float)
+    frames = []
+    for metric, values in blocks.items():
+        part = pd.DataFrame(values, index=names, columns=[str(s) for s in shops])
+        part["รวม"] = part.sum(axis=1)
+        part.columns = pd.MultiIndex.from_product([[metric], part.columns])
+        frames.append(part)
+    part = pd.DataFrame(pct, index=names, columns=[str(s) for s in shops]).round(2)
+    part.columns = pd.MultiIndex.from_product([["Δ %"], part.columns])
+    frames.append(part)
+    return pd.concat(frames, axis=1)
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+# -----------------------------
+# Settings
+# -----------------------------
+SNAPSHOT_DIR_ENV = "FINANCE_SNAPSHOT_DIR"
+DEFAULT_DIR = ".snapshots"
+FORMAT_VERSION = 2  # 2: ID เป็น int64 (ไฟล์เก่าเก็บ ID แบบ downcast)
+HEADER_KEY = b"finance.snapshot"
+
+
+def snapshot_dir():
+    return os.environ.get(SNAPSHOT_DIR_ENV, DEFAULT_DIR)
+
+
+def name_for(*parts):
+    """Stable file name for a cache key (database, sql, params)."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:16]
+    return f"q_{digest}"
+
+
+def path_for(name):
+    return os.path.join(snapshot_dir(), f"{name}.arrow")
+
+
+# -----------------------------
+# Write / read
+# -----------------------------
+def write(name, df, meta=None):
+    """Write ``df`` as an Arrow IPC file with a version header.
+
+    The file is written next to the target and renamed into place, so a
+    reader never sees a half-written snapshot.
+    """
+    os.makedirs(snapshot_dir(), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    header = {
+        "version": FORMAT_VERSION,
+        "name": name,
+        "written_at": time.time(),
+        "rows": len(df),
+        "meta": meta or {},
+    }
+    schema_meta = dict(table.schema.metadata or {})
+    schema_meta[HEADER_KEY] = json.dumps(header).encode("utf-8")
+    table = table.replace_schema_metadata(schema_meta)
+
+    path = path_for(name)
+    # temp file แยกต่อการเขียน: หลาย thread เขียน key เดียวกันพร้อมกันได้โดยไม่ทับไฟล์กัน
+    fd, tmp = tempfile.mkstemp(dir=snapshot_dir(), suffix=".tmp")
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp, "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def read(name, max_age=None):
+    """Memory-map a snapshot and return ``(df, header)``.
+
+    Returns None when the file is missing, unreadable, written by another
+    format version or older than ``max_age`` seconds.
+    """
+    path = path_for(name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path, "r") as source:
+            table = ipc.open_file(source).read_all()
+    except (pa.ArrowInvalid, OSError):
+        return None
+
+    raw = (table.schema.metadata or {}).get(HEADER_KEY)
+    if not raw:
+        return None
+    header = json.loads(raw)
+    if header.get("version") != FORMAT_VERSION:
+        return None
+    if max_age is not None and time.time() - header["written_at"] > max_age:
+        return None
+    return table.to_pandas(), header
+
+
+def remove(name):
+    try:
+        os.remove(path_for(name))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,121 @@
+import itertools
+import threading
+import weakref
+from collections import OrderedDict, deque
+
+import pandas as pd
+
+DEFAULT_BUDGET = 512 * 1024 * 1024  # bytes
+
+# pandas 3 ทำ Copy-on-Write เสมอ; pandas 2 ต้องเปิดเอง ไม่งั้น view ที่แชร์
+# ระหว่าง session จะถูกแก้ข้อมูลตัวจริงได้
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+class _Entry:
+    _versions = itertools.count(1)
+
+    def __init__(self, df, nbytes):
+        self.df = df
+        self.nbytes = nbytes
+        self.refs = 0
+        self.version = next(self._versions)
+
+
+class DataStore:
+    """Process-wide, read-only frames shared by every session.
+
+    ``get`` hands out shallow views; with Copy-on-Write a session that
+    edits its view copies only what it touches, so the shared frame never
+    changes and memory grows with distinct datasets, not with users.
+    Each live view counts as a reference (released when the view is
+    garbage-collected). When the total size passes ``max_bytes`` the
+    least recently used unreferenced frames are evicted.
+
+    Releases only queue the entry: the finalizer can run from cyclic GC
+    inside any locked section (of any thread), so it must not take the
+    lock. The queue is drained under the lock before counts are read.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._released = deque()
+        self.bytes = 0
+        self.evictions = 0
+
+    def _view(self, entry):
+        view = entry.df.copy(deep=False)
+        view.attrs["store_version"] = entry.version
+        entry.refs += 1
+        weakref.finalize(view, self._release, entry)
+        return view
+
+    def _release(self, entry):
+        # ห้ามจับ lock ที่นี่ (finalizer อาจถูกเรียกตอน GC ระหว่างที่ถือ lock อยู่)
+        self._released.append(entry)
+
+    def _drain(self):
+        while True:
+            try:
+                entry = self._released.popleft()
+            except IndexError:
+                return
+            entry.refs -= 1
+
+    def _evict(self):
+        self._drain()
+        for key in list(self._entries):
+            if self.bytes <= self.max_bytes:
+                return
+            entry = self._entries[key]
+            if entry.refs > 0:
+                continue  # ยังมี session ใช้อยู่
+            del self._entries[key]
+            self.bytes -= entry.nbytes
+            self.evictions += 1
+
+    def put(self, key, df):
+        """Store ``df`` under ``key`` and return a view of it."""
+        entry = _Entry(df, int(df.memory_usage(deep=True, index=True).sum()))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._entries[key] = entry
+            self.bytes += entry.nbytes
+            view = self._view(entry)
+            self._evict()
+        return view
+
+    def get(self, key):
+        """A view of the frame under ``key``, or None if absent / evicted."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return self._view(entry)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry.nbytes
+
+    def stats(self):
+        with self._lock:
+            self._drain()
+            return {
+                "entries": len(self._entries),
+                "mb": self.bytes / 1e6,
+                "budget_mb": self.max_bytes / 1e6,
+                "pinned": sum(1 for e in self._entries.values() if e.refs > 0),
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from core import db, dtypes, timing
+
+# -----------------------------
+# Settings
+# -----------------------------
+CHUNK_ENV = "FINANCE_STREAM_CHUNK"
+DEFAULT_CHUNK = 20_000   # แถวต่อ chunk
+FOLD_EVERY = 8           # รวม partial ทุก ๆ n chunk ให้ state เล็กเท่าจำนวน group
+SCALE = 10 ** dtypes.MONEY_DP   # fixed-point ตำแหน่งเดียวกับ dtypes "money"
+
+
+def chunk_size():
+    return int(os.environ.get(CHUNK_ENV, DEFAULT_CHUNK))
+
+
+def _to_units(values):
+    # บวกเป็นจำนวนเต็ม (int64 หน่วย 1/SCALE) ผลรวมจึงไม่ขึ้นกับลำดับ chunk และตรงกับ SUM บน SQL
+    return np.round(values.to_numpy(dtype=float, na_value=0.0) * SCALE).astype(np.int64)
+
+
+class StreamAggregate:
+    """Folds chunks of an upload table into running aggregates.
+
+    Only the per-group state is kept -- group sums per key and row counts
+    per status (NULL included) -- so memory depends on the number of
+    groups, not on the number of rows read.
+    """
+
+    def __init__(self, keys, value, status_col="Status_", schema=None):
+        self.keys = list(keys)
+        self.value = value
+        self.status_col = status_col
+        self.schema = schema or {}
+        self.rows = 0
+        self._sums, self._status = [], []
+
+    def add(self, chunk):
+        self.rows += len(chunk)
+        # แปลงเฉพาะคอลัมน์ตัวเลข ส่วน key แปลง dtype ทีเดียวตอนจบ (state เล็กกว่า chunk มาก)
+        values = chunk[self.value]
+        if self.value in self.schema:
+            values = dtypes.compact(chunk[[self.value]], {self.value: self.schema[self.value]})[self.value]
+        # amount ที่เป็น NULL นับเป็น 0 (group ที่ NULL ทั้งหมดได้ 0 เหมือน COALESCE(SUM, 0))
+        units = pd.Series(_to_units(values), index=chunk.index, name=self.value)
+
+        grouped = units.groupby([chunk[k] for k in self.keys], observed=True).sum()
+        self._sums.append(grouped)
+        self._status.append(chunk[self.status_col].value_counts(dropna=False))
+        if len(self._sums) >= FOLD_EVERY:
+            self._fold()
+
+    @staticmethod
+    def _combine(parts, levels):
+        if not parts:
+            return None
+        joined = pd.concat([p.reset_index() for p in parts], ignore_index=True)
+        value = joined.columns[-1]
+        return joined.groupby(levels, observed=True, dropna=False)[value].sum()
+
+    def _fold(self):
+        self._sums = [self._combine(self._sums, self.keys)]
+        self._status = [self._combine(self._status, [self.status_col])]
+
+    def grouped(self):
+        """Sum of ``value`` per key group, like ``grouped_sum_sql``."""
+        out = self._combine(self._sums, self.keys)
+        if out is None:
+            return pd.DataFrame(columns=[*self.keys, self.value])
+        out = out.reset_index().dropna(subset=self.keys)
+        out[self.value] = out[self.value] / SCALE
+        if self.schema:
+            out = dtypes.compact(out, self.schema)
+        return out.sort_values(self.keys, ignore_index=True)
+
+    def status(self):
+        """Row count per status (NULL included), like ``status_count_sql``."""
+        out = self._combine(self._status, [self.status_col])
+        if out is None:
+            return pd.DataFrame(columns=[self.status_col, "count"])
+        out = out.rename("count").reset_index()
+        out["count"] = out["count"].astype("int64")
+        if self.schema:
+            out = dtypes.compact(out, self.schema)
+        return out.sort_values(self.status_col, ignore_index=True)
+
+
+def aggregate(spec, sql, params=(), status_col="Status_", chunksize=None):
+    """Stream ``sql`` for an upload-table ``spec`` through a StreamAggregate."""
+    agg = StreamAggregate(spec["keys"], spec["value"], status_col=status_col, schema=spec["schema"])
+    with db.get_pool(spec["database"]).connection() as conn, timing.span("stream.read") as s:
+        for chunk in pd.read_sql(sql, conn, params=list(params) or None, chunksize=chunksize or chunk_size()):
+            agg.add(chunk)
+        s["rows"] = agg.rows
+    return agg
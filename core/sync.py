@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pandas as pd
+
+from core import dtypes, timing
+
+
+class TableSync:
+    """Keeps one upload table in memory and refreshes it by watermark.
+
+    The first call (and every ``reconcile_interval`` seconds after) reads
+    the whole table; that full reconcile is also what removes rows deleted
+    upstream. In between, at most every ``poll_interval`` seconds, only rows
+    with ``watermark_col`` past the last seen value are fetched. They are
+    upserted by ``id_col`` and the grouped sums / status counts are patched
+    with the difference instead of being recomputed.
+
+    Only rows whose watermark moves are seen by ``delta``. With a rowversion
+    or Modified_at column that covers inserts and updates; with an identity
+    ID or Created_at it covers inserts only, and rows updated in place show
+    up at the next reconcile. Use ``inclusive=True`` for timestamps so rows
+    sharing the last timestamp are not missed (they are deduplicated by
+    ``id_col``).
+    ``connection`` is a callable returning a connection context manager,
+    e.g. ``db.get_pool(...).connection`` or a SQLite stand-in.
+    ``schema`` (see core/dtypes.py) is applied to every read, so the kept
+    frame has the same compact dtypes as the other modes.
+    """
+
+    def __init__(self, table, keys, value, id_col, watermark_col, connection,
+                 status_col="Status_", inclusive=False, schema=None,
+                 poll_interval=30, reconcile_interval=3600):
+        self.table = table
+        self.keys = list(keys)
+        self.value = value
+        self.id_col = id_col
+        self.watermark_col = watermark_col
+        self.status_col = status_col
+        self.inclusive = inclusive
+        self.poll_interval = poll_interval
+        self.reconcile_interval = reconcile_interval
+        self._connection = connection
+        self.schema = schema or {}
+
+        self.frame = None
+        self.watermark = None
+        self.groups = None        # DataFrame[sum, count] indexed by keys
+        self.statuses = None      # Series: status -> row count (NaN status excluded)
+        self.total_rows = 0
+
+        self._lock = threading.Lock()
+        self._last_full = None
+        self._last_poll = None
+        self.stats = {"full_loads": 0, "delta_polls": 0, "delta_rows": 0}
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def _read(self, sql, params=None):
+        with self._connection() as conn, timing.span("sync.read") as s:
+            df = pd.read_sql(sql, conn, params=params)
+            s["rows"] = len(df)
+        return dtypes.compact(df, self.schema) if self.schema else df
+
+    def _index_by_id(self, df):
+        df = df.drop_duplicates(subset=[self.id_col], keep="last")
+        df.index = df[self.id_col].values
+        return df
+
+    # -----------------------------
+    # Aggregation helpers
+    # -----------------------------
+    def _group(self, df):
+        # count = จำนวนแถว (รวม amount NULL) group ที่ amount NULL ทั้งหมดจึงไม่หายหลัง delta
+        return df.groupby(self.keys, observed=True)[self.value].agg(sum="sum", count="size")
+
+    def _status(self, df):
+        return df.groupby(self.status_col, observed=True).size()
+
+    def _update_watermark(self, df):
+        if len(df) == 0:
+            return
+        top = df[self.watermark_col].max()
+        if hasattr(top, "item"):
+            top = top.item()  # numpy scalar -> Python (driver จะ bind เป็น blob ไม่ได้)
+        if self.watermark is None or top > self.watermark:
+            self.watermark = top
+
+    # -----------------------------
+    # Sync
+    # -----------------------------
+    def full_load(self):
+        df = self._index_by_id(self._read(f"SELECT * FROM [{self.table}]"))
+        self.frame = df
+        self.groups = self._group(df)
+        self.statuses = self._status(df)
+        self.total_rows = len(df)
+        self.watermark = None
+        self._update_watermark(df)
+        self._last_full = self._last_poll = time.monotonic()
+        self.stats["full_loads"] += 1
+
+    def delta(self):
+        op = ">=" if self.inclusive else ">"
+        if self.watermark is None:
+            new = self._read(f"SELECT * FROM [{self.table}]")
+        else:
+            new = self._read(
+                f"SELECT * FROM [{self.table}] WHERE [{self.watermark_col}] {op} ?",
+                params=[self.watermark],
+            )
+        self._last_poll = time.monotonic()
+        self.stats["delta_polls"] += 1
+        if len(new) == 0:
+            return 0
+
+        new = self._index_by_id(new)
+        replaced = new.index.intersection(self.frame.index)
+        old = self.frame.loc[replaced]
+
+        # ลบผลของแถวเดิม แล้วบวกผลของแถวใหม่
+        groups = self.groups.sub(self._group(old), fill_value=0).add(self._group(new), fill_value=0)
+        self.groups = groups[groups["count"] > 0]
+        statuses = self.statuses.sub(self._status(old), fill_value=0).add(self._status(new), fill_value=0)
+        self.statuses = statuses[statuses > 0].astype(int)
+        self.total_rows += len(new) - len(old)
+
+        frame = pd.concat([self.frame.drop(index=replaced), new])
+        # category ที่ชุดค่าไม่เท่ากันจะกลายเป็น object หลัง concat -> cast กลับ
+        self.frame = dtypes.compact(frame, self.schema) if self.schema else frame
+        self._update_watermark(new)
+        self.stats["delta_rows"] += len(new)
+        return len(new)
+
+    def maybe_sync(self, force_full=False):
+        with self._lock:
+            now = time.monotonic()
+            if (force_full or self.frame is None
+                    or now - self._last_full >= self.reconcile_interval):
+                self.full_load()
+            elif now - self._last_poll >= self.poll_interval:
+                self.delta()
+        return self
+
+    def reset(self):
+        """Force a full reconcile on the next ``maybe_sync``."""
+        with self._lock:
+            self.frame = None
+
+    # -----------------------------
+    # Outputs (same shape as the pandas groupby path)
+    # -----------------------------
+    def grouped_sum(self):
+        with self._lock:
+            out = self.groups["sum"].rename(self.value).reset_index()
+        # sub/add ของ delta ทำ index category หลุด -> cast ผลลัพธ์ (เล็ก) อีกรอบ
+        out = dtypes.compact(out, self.schema) if self.schema else out
+        return out.sort_values(self.keys).reset_index(drop=True)
+
+    def status_counts(self):
+        with self._lock:
+            counts = self.statuses.rename("count").reset_index()
+            total = self.total_rows
+        counts["count"] = counts["count"].astype(int)
+        counts = dtypes.compact(counts, self.schema) if self.schema else counts
+        return counts.sort_values(self.status_col).reset_index(drop=True), total
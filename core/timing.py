@@ -0,0 +1,242 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -----------------------------
+# Settings
+# -----------------------------
+METRICS_FILE_ENV = "FINANCE_METRICS_FILE"   # เขียน Prometheus text ทุกครั้งที่ rerun จบ
+METRICS_PORT_ENV = "FINANCE_METRICS_PORT"   # เปิด http://127.0.0.1:<port>/metrics
+
+# ขอบบนของ histogram bucket (วินาที)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+# -----------------------------
+# Per-rerun trace
+# -----------------------------
+class Trace:
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def add(self, name, seconds, rows):
+        self.spans.append({"stage": name, "ms": round(seconds * 1000, 1), "rows": rows})
+
+    def total_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+
+# Streamlit รันแต่ละ session ใน thread ของตัวเอง -> ContextVar แยก trace ให้เอง
+_current = ContextVar("finance_trace", default=None)
+
+
+def start_rerun(page):
+    trace = Trace(page)
+    _current.set(trace)
+    return trace
+
+
+def current():
+    return _current.get()
+
+
+# -----------------------------
+# Aggregated histograms (process-wide)
+# -----------------------------
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.rows = 0
+
+    def observe(self, seconds, rows):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += seconds
+        self.count += 1
+        self.rows += rows or 0
+
+
+_histograms = {}
+_hist_lock = threading.Lock()
+
+
+def observe(name, seconds, rows=None):
+    with _hist_lock:
+        _histograms.setdefault(name, _Histogram()).observe(seconds, rows)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds, rows)
+
+
+@contextmanager
+def span(name, rows=None):
+    """Time a block as stage ``name``.
+
+    ``rows`` may be set later through the yielded dict, e.g.
+    ``with span("sql.read") as s: df = ...; s["rows"] = len(df)``.
+    """
+    info = {"rows": rows}
+    started = time.perf_counter()
+    try:
+        yield info
+    finally:
+        observe(name, time.perf_counter() - started, info["rows"])
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def snapshot():
+    with _hist_lock:
+        return {
+            name: {
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts)),
+                "sum": h.sum,
+                "count": h.count,
+                "rows": h.rows,
+            }
+            for name, h in _histograms.items()
+        }
+
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+
+def to_prometheus():
+    lines = [
+        "# HELP finance_stage_seconds Time spent per app stage.",
+        "# TYPE finance_stage_seconds histogram",
+    ]
+    rows_lines = [
+        "# HELP finance_stage_rows_total Rows handled per app stage.",
+        "# TYPE finance_stage_rows_total counter",
+    ]
+    for name, h in sorted(snapshot().items()):
+        cumulative = 0
+        for le, n in h["buckets"].items():
+            cumulative += n
+            lines.append(f'finance_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'finance_stage_seconds_sum{{stage="{name}"}} {h["sum"]:.6f}')
+        lines.append(f'finance_stage_seconds_count{{stage="{name}"}} {h["count"]}')
+        rows_lines.append(f'finance_stage_rows_total{{stage="{name}"}} {h["rows"]}')
+    return "\n".join(lines + rows_lines) + "\n"
+
+
+def write_metrics(path=None):
+    path = path or os.environ.get(METRICS_FILE_ENV)
+    if not path:
+        return None
+    # temp file แยกต่อการเขียน: หลาย session rerun พร้อมกันจะไม่ replace ไฟล์ของกันและกัน
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(to_prometheus())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, ctype = to_json(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, ctype = to_prometheus(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_error = None     # bind ไม่ได้ (เช่น port ถูก process อื่นใช้) -> ไม่ลองใหม่ทุก rerun
+_server_lock = threading.Lock()
+
+
+def serve(port=None):
+    """Start the local /metrics endpoint once per process (if a port is set).
+
+    If the port cannot be bound (e.g. a second app process on the same
+    host), the error is recorded once, shown in the debug panel and not
+    retried.
+    """
+    global _server, _server_error
+    port = port or os.environ.get(METRICS_PORT_ENV)
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None and _server_error is None:
+            try:
+                _server = ThreadingHTTPServer(("127.0.0.1", int(port)), _MetricsHandler)
+            except OSError as ex:
+                _server_error = ex
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
+
+
+# -----------------------------
+# Streamlit debug panel
+# -----------------------------
+def finish_rerun(st, trace, memory=None, imports=None, panel=True):
+    """Record the rerun total, export metrics and show the opt-in panel.
+
+    ``memory`` is an optional list of per-dataset size rows to show too,
+    ``imports`` the first-import costs from ``lazy.report()``. Connection
+    pool stats and the timings of this session's last successful login
+    (``session_state.last_login_timing``, set by Login.py) are always shown. Pass
+    ``panel=False`` where the viewer is not logged in.
+    """
+    observe(f"{trace.page}.rerun", (time.perf_counter() - trace.started))
+    write_metrics()
+    serve()
+    if panel and st.sidebar.checkbox("🐞 Debug timings", key=f"debug_timings_{trace.page}"):
+        st.sidebar.caption(f"{trace.page}: {trace.total_ms()} ms this rerun")
+        st.sidebar.dataframe(trace.spans, use_container_width=True)
+        if _server_error is not None:
+            st.sidebar.caption(f"/metrics ปิดอยู่: {_server_error}")
+        from core import db  # db import timing อยู่แล้ว -> import ตอนใช้
+
+        login = st.session_state.get("last_login_timing")
+        if login:
+            st.sidebar.caption(
+                f"Login: DB {login['db_ms']:.0f} ms | hash {login['hash_ms']:.0f} ms | "
+                f"total {login['total_ms']:.0f} ms"
+            )
+        pools = [{"database": name, **stats} for name, stats in db.pool_stats().items()]
+        if pools:
+            st.sidebar.caption("Connection pools")
+            st.sidebar.dataframe(pools, use_container_width=True)
+        if memory:
+            st.sidebar.caption("Memory (MB) before → after compact dtypes")
+            st.sidebar.dataframe(memory, use_container_width=True)
+        if imports:
+            st.sidebar.caption("Lazy imports (first use in this process)")
+            st.sidebar.dataframe(imports, use_container_width=True)
@@ -0,0 +1,118 @@
+import time
+
+import pandas as pd
+
+
+def _py_rows(df):
+    """DataFrame -> list of tuples of plain Python values (NaN -> None)."""
+    obj = df.astype(object).where(df.notna(), None)
+    return [tuple(row) for row in obj.itertuples(index=False, name=None)]
+
+
+def diff_frames(before, after, key="ID"):
+    """Compare an edited table with the snapshot it was loaded from.
+
+    Returns ``{"insert": df, "update": df, "delete": [keys]}``. Rows without
+    a key (new rows from ``st.data_editor``) are inserted without it so the
+    identity column assigns one; rows whose key is new are inserted with it.
+    Raises ValueError when an integer key holds something that is not a
+    whole number, or when the same key appears on more than one row.
+    """
+    cols = [c for c in after.columns if c in before.columns]
+    old = before[cols]
+
+    new_rows = after[after[key].isna()]
+    keyed = after[after[key].notna()][cols]
+    if pd.api.types.is_integer_dtype(old[key]):
+        # เทียบ key เป็น int64 ทั้งสองฝั่ง (cast ไป dtype เล็กของ before จะล้นแบบเงียบ ๆ)
+        values = pd.to_numeric(keyed[key], errors="coerce")
+        if values.isna().any() or not (values == values.round()).all():
+            raise ValueError(f"{key} must be a whole number")
+        keyed = keyed.astype({key: "int64"})
+        old = old.astype({key: "int64"})
+    dupes = keyed[key][keyed[key].duplicated()].unique().tolist()
+    if dupes:
+        raise ValueError(f"duplicate {key}: {', '.join(str(d) for d in dupes)}")
+    old = old.set_index(key, drop=False)
+    keyed = keyed.set_index(key, drop=False)
+
+    common = keyed.index.intersection(old.index)
+    value_cols = [c for c in cols if c != key]
+    a = keyed.loc[common, value_cols]
+    b = old.loc[common, value_cols]
+    same = (a == b) | (a.isna() & b.isna())
+    changed = common[~same.all(axis=1).to_numpy()]
+
+    inserts = pd.concat([
+        keyed.loc[keyed.index.difference(old.index)].reset_index(drop=True),
+        new_rows[cols].reset_index(drop=True),
+    ], ignore_index=True)
+
+    return {
+        "insert": inserts,
+        "update": keyed.loc[changed].reset_index(drop=True),
+        "delete": old.index.difference(keyed.index).tolist(),
+    }
+
+
+def apply_diff(conn, table, diff, key="ID", identity=True):
+    """Run a diff as batched DELETE / UPDATE / INSERT in one transaction.
+
+    Returns counts per statement type and the elapsed seconds. The caller
+    owns the connection; on error the transaction is rolled back and the
+    exception re-raised.
+    """
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    if hasattr(cursor, "fast_executemany"):
+        cursor.fast_executemany = True  # pyodbc: bind ทั้ง batch ทีเดียว
+
+    counts = {"inserted": 0, "updated": 0, "deleted": 0}
+    try:
+        if diff["delete"]:
+            cursor.executemany(
+                f"DELETE FROM {table} WHERE [{key}] = ?",
+                [(k.item() if hasattr(k, "item") else k,) for k in diff["delete"]],
+            )
+            counts["deleted"] = len(diff["delete"])
+
+        updates = diff["update"]
+        if len(updates):
+            value_cols = [c for c in updates.columns if c != key]
+            set_sql = ", ".join(f"[{c}] = ?" for c in value_cols)
+            cursor.executemany(
+                f"UPDATE {table} SET {set_sql} WHERE [{key}] = ?",
+                _py_rows(updates[value_cols + [key]]),
+            )
+            counts["updated"] = len(updates)
+
+        inserts = diff["insert"]
+        if len(inserts):
+            with_key = inserts[inserts[key].notna()]
+            without_key = inserts[inserts[key].isna()].drop(columns=[key])
+            if len(with_key):
+                if identity:
+                    cursor.execute(f"SET IDENTITY_INSERT {table} ON")
+                _insert(cursor, table, with_key)
+                if identity:
+                    cursor.execute(f"SET IDENTITY_INSERT {table} OFF")
+            if len(without_key):
+                _insert(cursor, table, without_key)
+            counts["inserted"] = len(inserts)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    counts["seconds"] = time.perf_counter() - started
+    return counts
+
+
+def _insert(cursor, table, df):
+    cols = df.columns.tolist()
+    cols_str = ", ".join(f"[{c}]" for c in cols)
+    placeholders = ", ".join(["?"] * len(cols))
+    cursor.executemany(f"INSERT INTO {table} ({cols_str}) VALUES ({placeholders})", _py_rows(df))
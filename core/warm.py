@@ -0,0 +1,148 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+from core import cache, dashboard, db, queries, timing
+
+# -----------------------------
+# Settings
+# -----------------------------
+INTERVAL_ENV = "FINANCE_WARM_INTERVAL"   # วินาที ระหว่างรอบ (0 = ปิด scheduler)
+JITTER_ENV = "FINANCE_WARM_JITTER"       # สัดส่วนสุ่มบวกลบของ interval
+DEFAULT_INTERVAL = 300
+DEFAULT_JITTER = 0.1
+
+
+class Warmer:
+    """Rebuilds the unfiltered dashboard datasets in the background.
+
+    ``build`` (``dashboard.build`` by default) runs every ``interval``
+    seconds, +/- ``jitter`` so several replicas do not hit the database
+    at the same moment. The result and its metadata are published as one
+    tuple, so readers see either the old or the new set, never a mix.
+    A round where any dataset failed (``data["errors"]``) is not published.
+    Only one rebuild runs at a time; a caller asking while one is in
+    flight waits for it instead of starting another. Each scheduled round
+    also closes stale idle DB connections (``db.evict_idle``).
+
+    ``built_at`` is when the data was read from the database: a build
+    served from on-disk snapshots is dated by the oldest snapshot. With
+    the scheduler off (``interval`` 0), ``get`` rebuilds from the database
+    once the data is older than ``max_age`` (the query cache TTL).
+    """
+
+    def __init__(self, build=None, interval=DEFAULT_INTERVAL, jitter=DEFAULT_JITTER,
+                 tables=(queries.AP["table"], queries.AR["table"]), max_age=None):
+        self.build = build or dashboard.build
+        self.interval = interval
+        self.max_age = cache.query_cache.ttl if max_age is None else max_age
+        self.jitter = jitter
+        self.tables = tables
+        self._published = (None, {"built_at": None, "seconds": None, "error": None, "runs": 0})
+        self._flight = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def latest(self):
+        """``(data, meta)`` of the last successful rebuild (data None before the first)."""
+        data, meta = self._published
+        meta = dict(meta)
+        if meta["built_at"] is not None:
+            meta["age"] = (datetime.now() - meta["built_at"]).total_seconds()
+        return data, meta
+
+    def get(self):
+        """Published data; builds it now (once, for everyone) if there is none yet."""
+        data, meta = self.latest()
+        if data is None:
+            self.refresh()
+            data, meta = self.latest()
+        elif self.interval <= 0 and meta["age"] > self.max_age:
+            # ไม่มี scheduler -> ข้อมูลเก่ากว่า TTL ให้โหลดใหม่จาก DB เหมือนไม่มี warmer
+            self.refresh(reload=True)
+            data, meta = self.latest()
+        return data, meta
+
+    # -----------------------------
+    # Rebuild
+    # -----------------------------
+    def refresh(self, reload=False):
+        """Rebuild and publish; with ``reload`` cached query results are dropped first."""
+        if not self._flight.acquire(blocking=False):
+            # มีคนกำลัง rebuild อยู่ -> รอผลรอบนั้นแทนการ query ซ้ำ
+            with self._flight:
+                return
+        try:
+            if reload:
+                # ลบทั้ง cache และ snapshot ให้รอบนี้อ่านจาก DB จริง (built_at จะได้ตรง)
+                for table in self.tables:
+                    cache.refresh(table)
+            _, meta = self._published
+            started = time.perf_counter()
+            try:
+                with timing.span("warm.build"), cache.snapshot_times() as served:
+                    data = self.build()
+            except Exception as ex:
+                self._published = (self._published[0], {**meta, "error": repr(ex)})
+                return
+            if data.get("errors"):
+                # build ไม่ raise แต่คืนตารางว่าง + errors -> ถือว่ารอบนี้ล้ม เก็บชุดเดิมไว้
+                error = "; ".join(f"{name}: {ex!r}" for name, ex in data["errors"].items())
+                self._published = (self._published[0], {**meta, "error": error})
+                return
+            self._published = (data, {
+                # ข้อมูลจาก snapshot ให้ลงเวลาตาม snapshot ที่เก่าที่สุด ไม่ใช่เวลาที่ build
+                "built_at": datetime.fromtimestamp(min(served)) if served else datetime.now(),
+                "seconds": time.perf_counter() - started,
+                "error": None,
+                "runs": meta["runs"] + 1,
+            })
+        finally:
+            self._flight.release()
+
+    def _delay(self):
+        return max(1.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _loop(self):
+        while not self._stop.wait(self._delay()):
+            self.refresh(reload=True)
+            db.evict_idle()
+
+    def start(self):
+        """Start the scheduler thread once per process (no-op when interval is 0)."""
+        with self._start_lock:
+            if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="dashboard-warm", daemon=True)
+            self._thread.start()
+            # รอบแรกทำทันทีใน background คนแรกที่เข้ามาจะได้ไม่ต้องรอ
+            threading.Thread(target=self.refresh, name="dashboard-warm-first", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# -----------------------------
+# Process-wide warmer
+# -----------------------------
+_warmer = None
+_warmer_lock = threading.Lock()
+
+
+def get_warmer():
+    global _warmer
+    with _warmer_lock:
+        if _warmer is None:
+            _warmer = Warmer(
+                interval=float(os.environ.get(INTERVAL_ENV, DEFAULT_INTERVAL)),
+                jitter=float(os.environ.get(JITTER_ENV, DEFAULT_JITTER)),
+            )
+            _warmer.start()
+    return _warmer
@@ -1,19 +1,20 @@
 import streamlit as st
 import pandas as pd
-import pyodbc
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
 import time
-import plotly.express as px
 from streamlit_cookies_manager import EncryptedCookieManager
 from datetime import datetime
-import altair as alt
+from core import cache, dashboard, dtypes, lazy, paging, queries, timing, warm
+
+# library กราฟโหลดตอนวาดครั้งแรก (หน้าที่ st.stop() ก่อนไม่ต้องจ่าย)
+px = lazy.module("plotly.express")
+alt = lazy.module("altair")
 
 st.set_page_config(
     page_title="Finance App",
     page_icon="💰",
     layout="wide"
 )
+trace = timing.start_rerun("dashboard")
 # -----------------------------
 # Cookie Manager (ต้องใช้ prefix/password เดียวกับ app.py)
 # -----------------------------
@@ -46,143 +47,74 @@ st.write(f"Welcome {st.session_state.username} to the Dashboard!")
 
 
 # -----------------------------
-# Azure Key Vault
-# -----------------------------
-keyVaultName = "financeproject"
-KVUri = f"https://{keyVaultName}.vault.azure.net/"
-
-credential = DefaultAzureCredential()
-client = SecretClient(vault_url=KVUri, credential=credential)
-
-sql_username = client.get_secret("SQL-Username").value
-sql_password = client.get_secret("SQL-Password").value
-
-server = "assetcontrol.database.windows.net"
-database = "finance_project"
-
-def get_connection():
-    conn = pyodbc.connect(
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={server};DATABASE={database};UID={sql_username};PWD={sql_password}"
-    )
-    return conn
-
-
-def load_ap_erp():
-    conn = get_connection()
-    df = pd.read_sql("SELECT * FROM Cash_AP_Upload", conn)
-    conn.close()
-    st.session_state["AP_ERP"] = df
-    return df
-
-# -----------------------------
-# Load AP_EXCEL
+# Data cache (shared across sessions, credentials from cached Key Vault)
 # -----------------------------
-def load_ap_excel():
-    conn = get_connection()
-    df = pd.read_sql("SELECT * FROM Cash_AP_Upload", conn)
-    conn.close()
-    st.session_state["AP_EXCEL"] = df
-    return df
+# ชุดข้อมูลแบบไม่ filter ถูก rebuild ใน background (core/warm.py) ทุกคนใช้ชุดเดียวกัน
+warmer = warm.get_warmer()
+if st.sidebar.button("🔄 Refresh data"):
+    queries.refresh(queries.AP, queries.AR)
+    warmer.refresh()
+    st.rerun()
 
 
-if "AP_ERP" not in st.session_state:
-    ap_df = load_ap_erp()
-else:
-    ap_df = st.session_state["AP_ERP"]
-    
-if "AP_EXCEL" not in st.session_state:
-    ap_df_excel = load_ap_excel()
-else:
-    ap_df_excel = st.session_state["AP_EXCEL"]
-
-ap_sum = ap_df.groupby(["Vendor_No","Vendor_Name","original_duedate","Status_"], as_index=False)["amount"].sum().rename(columns={"amount": "amount_AP"})
-ap_sum_excel = ap_df_excel.groupby(["Vendor_No","Vendor_Name","original_duedate","Status_"], as_index=False)["amount"].sum().rename(columns={"amount": "amount_excel"})
-
-ap_sum["original_duedate"] = pd.to_datetime(ap_sum["original_duedate"], format="%Y-%m-%d", errors="coerce")
-ap_sum_excel["original_duedate"] = pd.to_datetime(ap_sum_excel["original_duedate"], format="%Y-%m-%d", errors="coerce")
-# -----------------------------
-# Merge ทั้งสอง table ด้วย DOC_ID + ITEM_Description
-# -----------------------------
-merged_df = pd.merge(ap_sum, ap_sum_excel, on=["Vendor_No","Vendor_Name","original_duedate","Status_"], how="outer")
-
-# -----------------------------
-# เพิ่ม column รวมทั้งสอง
-# -----------------------------
-merged_df["Total_Amount"] = merged_df["amount_AP"]+ merged_df["amount_excel"]
 # -----------------------------
-# เลือกเฉพาะคอลัมน์ที่ต้องการแสดง
+# Filters (ส่งเป็น WHERE ไปที่ SQL, ผลของแต่ละชุด filter ถูก cache แยกกัน)
 # -----------------------------
-# -----------------------------
-# แปลง DueWeek → w{week}-{month}
-# -----------------------------
-def week_in_month(d):
-    if pd.isna(d):
-        return None
-    week_num = (d.day - 1) // 7 + 1
-    return f"w{week_num}-{d.strftime('%m')}"
-
-merged_df["DueWeek"] = merged_df["original_duedate"].apply(week_in_month)
-st.dataframe(merged_df)
-
-
-# -----------------------------------
-# AR
-# -----------------------------------
-def load_ar_erp():
-    conn = get_connection()
-    df = pd.read_sql("SELECT * FROM Cash_AR_Upload", conn)
-    conn.close()
-    st.session_state["AR_ERP"] = df
-    return df
-
-
-def load_ar_excel():
-    conn = get_connection()
-    df = pd.read_sql("SELECT * FROM Cash_AR_Upload", conn)
-    conn.close()
-    st.session_state["AR_EXCEL"] = df
-    return df
-
-if "AR_ERP" not in st.session_state:
-    ar_df = load_ar_erp()
-else:
-    ar_df = st.session_state["AR_ERP"]
-    
-if "AR_EXCEL" not in st.session_state:
-    ar_df_excel = load_ar_excel()
+st.sidebar.subheader("🔎 Filters")
+today = pd.Timestamp.today().normalize()
+date_presets = {
+    "ทั้งหมด": (None, None),
+    "เดือนนี้": (today.replace(day=1), today + pd.offsets.MonthEnd(0)),
+    "เลยกำหนด": (None, today - pd.Timedelta(days=1)),
+}
+preset = st.sidebar.selectbox("ช่วง Due date", list(date_presets) + ["กำหนดเอง"])
+if preset == "กำหนดเอง":
+    picked = st.sidebar.date_input("Due date", value=(today.replace(day=1), today))
+    date_from, date_to = (picked + (None, None))[:2] if isinstance(picked, tuple) else (picked, None)
 else:
-    ar_df_excel = st.session_state["AR_EXCEL"]
-
-ar_sum = ar_df.groupby(["Customer_No","Customer_Name","original_duedate","Status_"], as_index=False)["amount"].sum().rename(columns={"amount": "amount_AR"})
-ar_sum_excel = ar_df_excel.groupby(["Customer_No","Customer_Name","original_duedate","Status_"], as_index=False)["amount"].sum().rename(columns={"amount": "amount_excel"})
+    date_from, date_to = date_presets[preset]
 
-ar_sum["original_duedate"] = pd.to_datetime(ar_sum["original_duedate"], format="%Y-%m-%d", errors="coerce")
-ar_sum_excel["original_duedate"] = pd.to_datetime(ar_sum_excel["original_duedate"], format="%Y-%m-%d", errors="coerce")
-# -----------------------------
-# Merge ทั้งสอง table ด้วย DOC_ID + ITEM_Description
-# -----------------------------
-merged_df_ar = pd.merge(ar_sum, ar_sum_excel, on=["Customer_No","Customer_Name","original_duedate","Status_"], how="outer")
-
-# -----------------------------
-# เพิ่ม column รวมทั้งสอง
-# -----------------------------
-merged_df_ar["Total_Amount"] = merged_df_ar["amount_AR"]+ merged_df_ar["amount_excel"]
-# -----------------------------
-# เลือกเฉพาะคอลัมน์ที่ต้องการแสดง
-# -----------------------------
-# -----------------------------
-# แปลง DueWeek → w{week}-{month}
-# -----------------------------
-def week_in_month(d):
-    if pd.isna(d):
-        return None
-    week_num = (d.day - 1) // 7 + 1
-    return f"w{week_num}-{d.strftime('%m')}"
-
-merged_df_ar["DueWeek"] = merged_df_ar["original_duedate"].apply(week_in_month)
-
-st.dataframe(merged_df_ar)
+statuses = st.sidebar.multiselect(
+    "Status",
+    sorted(set(queries.distinct_values(queries.AP, "Status_")) | set(queries.distinct_values(queries.AR, "Status_"))),
+)
+vendors = st.sidebar.multiselect("Vendor", queries.distinct_values(queries.AP, queries.AP["party"]))
+customers = st.sidebar.multiselect("Customer", queries.distinct_values(queries.AR, queries.AR["party"]))
+
+ap_filters = queries.make_filters(date_from, date_to, vendors, statuses)
+ar_filters = queries.make_filters(date_from, date_to, customers, statuses)
+
+
+# -----------------------------
+# AP / AR: GROUP BY ทำบน SQL แล้ว merge ERP + EXCEL (ดู core/dashboard.py)
+# ชุดข้อมูลที่ไม่ขึ้นต่อกันโหลดพร้อมกัน ตัวไหนพังแสดงเป็นตารางว่าง
+# -----------------------------
+with timing.span("dashboard.data"):
+    data = None
+    if ap_filters is None and ar_filters is None:
+        data, warm_meta = warmer.get()
+        if warm_meta["built_at"] is not None:
+            st.caption(
+                f"🕒 ข้อมูล ณ {warm_meta['built_at']:%Y-%m-%d %H:%M:%S} "
+                f"({warm_meta['age'] / 60:.0f} นาทีที่แล้ว, build {warm_meta['seconds']:.1f}s)"
+                + (f" · รีเฟรชอัตโนมัติทุก {warmer.interval / 60:g} นาที" if warmer.interval > 0 else "")
+            )
+        if warm_meta["error"]:
+            st.warning(f"⚠️ รีเฟรชรอบล่าสุดไม่สำเร็จ แสดงข้อมูลชุดก่อนหน้า: {warm_meta['error']}")
+    if data is None:
+        data = dashboard.build(ap_filters=ap_filters, ar_filters=ar_filters)
+for name, error in data["errors"].items():
+    st.warning(f"⚠️ โหลด {name} ไม่สำเร็จ: {error}")
+merged_df = data["merged_df"]
+merged_df_ar = data["merged_df_ar"]
+plot_df = data["plot_df"]
+pivot_df = data["pivot_df"]
+week_order = data["week_order"]
+
+# ส่งเฉพาะหน้าที่มองเห็นไป browser (filter / sort ทำฝั่ง server)
+with timing.span("render.table", rows=len(merged_df) + len(merged_df_ar)):
+    paging.paged_table(st, merged_df, key="ap_table")
+    paging.paged_table(st, merged_df_ar, key="ar_table")
 
 # ปุ่ม Logout
 if st.sidebar.button("🚪 Logout"):
@@ -193,47 +125,17 @@ if st.sidebar.button("🚪 Logout"):
     cookies.save()
     st.switch_page("Login.py")
 
-# AP processing
-ap_df = load_ap_erp()
-ap_df_excel = load_ap_excel()
-ap_sum = ap_df.groupby(["Vendor_No", "Vendor_Name", "original_duedate", "Status_"], as_index=False)["amount"].sum().rename(columns={"amount": "amount_AP"})
-ap_sum_excel = ap_df_excel.groupby(["Vendor_No", "Vendor_Name", "original_duedate", "Status_"], as_index=False)["amount"].sum().rename(columns={"amount": "amount_excel"})
-ap_sum["original_duedate"] = pd.to_datetime(ap_sum["original_duedate"], format="%Y-%m-%d", errors="coerce")
-ap_sum_excel["original_duedate"] = pd.to_datetime(ap_sum_excel["original_duedate"], format="%Y-%m-%d", errors="coerce")
-merged_df = pd.merge(ap_sum, ap_sum_excel, on=["Vendor_No", "Vendor_Name", "original_duedate", "Status_"], how="outer")
-merged_df["Total_Amount"] = merged_df["amount_AP"] + merged_df["amount_excel"]
-merged_df["DueWeek"] = merged_df["original_duedate"].apply(week_in_month)
-merged_df["Category"] = "AP"
-
-# AR processing
-ar_df = load_ar_erp()
-ar_df_excel = load_ar_excel()
-ar_sum = ar_df.groupby(["Customer_No", "Customer_Name", "original_duedate", "Status_"], as_index=False)["amount"].sum().rename(columns={"amount": "amount_AR"})
-ar_sum_excel = ar_df_excel.groupby(["Customer_No", "Customer_Name", "original_duedate", "Status_"], as_index=False)["amount"].sum().rename(columns={"amount": "amount_excel"})
-ar_sum["original_duedate"] = pd.to_datetime(ar_sum["original_duedate"], format="%Y-%m-%d", errors="coerce")
-ar_sum_excel["original_duedate"] = pd.to_datetime(ar_sum_excel["original_duedate"], format="%Y-%m-%d", errors="coerce")
-merged_df_ar = pd.merge(ar_sum, ar_sum_excel, on=["Customer_No", "Customer_Name", "original_duedate", "Status_"], how="outer")
-merged_df_ar["Total_Amount"] = merged_df_ar["amount_AR"] + merged_df_ar["amount_excel"]
-merged_df_ar["DueWeek"] = merged_df_ar["original_duedate"].apply(week_in_month)
-merged_df_ar["Category"] = "AR"
-
-# Combine and aggregate
-final_df = pd.concat([merged_df, merged_df_ar])
-plot_df = final_df.groupby(["DueWeek", "Category"])["Total_Amount"].sum().reset_index()
-
-# Sort the DueWeek for correct order on the chart
-plot_df["sort_order"] = plot_df["DueWeek"].str.extract('w(\d+)').astype(int)
-plot_df = plot_df.sort_values(by="sort_order")
-
-# Pivot the table to have separate columns for AR and AP amounts for line chart
-pivot_df = plot_df.pivot_table(index='DueWeek', columns='Category', values='Total_Amount').reset_index()
-pivot_df['Difference'] = pivot_df['AR'] - pivot_df['AP']
-
+cache_stats = cache.query_cache.stats()
+store_stats = cache_stats["store"]
+st.sidebar.caption(
+    f"Cache hit {cache_stats['hits']} / miss {cache_stats['misses']} | "
+    f"store {store_stats['mb']:.1f}/{store_stats['budget_mb']:.0f} MB"
+)
 
 # Calculate the total AR amount
-total_ar = merged_df_ar["Total_Amount"].sum()
-total_ap = merged_df["Total_Amount"].sum()
-total_cash = total_ar - total_ap
+total_ar = data["total_ar"]
+total_ap = data["total_ap"]
+total_cash = data["total_cash"]
 # --- สร้าง Layout ของ Streamlit ---
 st.title("Financial Overview Dashboard")
 
@@ -258,7 +160,7 @@ st.title("Total AR & AP and Difference by Week")
 
 # 1. สร้างกราฟแท่ง
 bar_chart = alt.Chart(plot_df).mark_bar().encode(
-    x=alt.X('DueWeek:N', title='Due Week'),
+    x=alt.X('DueWeek:N', title='Due Week', sort=week_order),
     xOffset=alt.XOffset('Category:N', title='Category'),
     y=alt.Y('Total_Amount:Q', title='Total Amount'),
     color=alt.Color('Category:N', title='Category'),
@@ -267,7 +169,7 @@ bar_chart = alt.Chart(plot_df).mark_bar().encode(
 
 # 2. สร้างกราฟเส้น
 line_chart = alt.Chart(pivot_df).mark_line(point=True, color='red').encode(
-    x=alt.X('DueWeek:N', title='Due Week'),
+    x=alt.X('DueWeek:N', title='Due Week', sort=week_order),
     y=alt.Y('Difference:Q', title='AR - AP Difference'),
     tooltip=['DueWeek', 'Difference']
 )
@@ -279,7 +181,8 @@ combined_chart = alt.layer(bar_chart, line_chart).resolve_scale(
     title='Combined AR & AP Bar Chart and AR-AP Line Chart'
 ).interactive()
 
-st.altair_chart(combined_chart, use_container_width=True)
+with timing.span("render.altair", rows=len(plot_df)):
+    st.altair_chart(combined_chart, use_container_width=True)
 
 # --- สร้าง Layout ของ Streamlit ---
 st.title("Percent Status")
@@ -290,13 +193,8 @@ col1, col2 = st.columns(2)
 with col1:
     st.subheader("AR Status Distribution")
     
-    # Calculate AR status percentages
-    ar_status_counts = ar_df.groupby('Status_').size().reset_index(name='count')
-    total_ar_count = ar_df.shape[0]
-    if total_ar_count > 0:
-        ar_status_counts['percentage'] = (ar_status_counts['count'] / total_ar_count) * 100
-    else:
-        ar_status_counts['percentage'] = 0
+    # Calculate AR status percentages (COUNT ทำบน SQL)
+    ar_status_counts = data["ar_status_counts"]
 
     # Create and display AR donut chart
     ar_donut_chart = px.pie(
@@ -306,19 +204,15 @@ with col1:
         hole=0.4
     )
     ar_donut_chart.update_traces(textposition='inside', textinfo='percent+label')
-    st.plotly_chart(ar_donut_chart, use_container_width=True)
+    with timing.span("render.plotly"):
+        st.plotly_chart(ar_donut_chart, use_container_width=True)
 
 # --- AP Donut Chart ---
 with col2:
     st.subheader("AP Status Distribution")
 
-    # Calculate AP status percentages
-    ap_status_counts = ap_df.groupby('Status_').size().reset_index(name='count')
-    total_ap_count = ap_df.shape[0]
-    if total_ap_count > 0:
-        ap_status_counts['percentage'] = (ap_status_counts['count'] / total_ap_count) * 100
-    else:
-        ap_status_counts['percentage'] = 0
+    # Calculate AP status percentages (COUNT ทำบน SQL)
+    ap_status_counts = data["ap_status_counts"]
 
     # Create and display AP donut chart
     ap_donut_chart = px.pie(
@@ -328,5 +222,9 @@ with col2:
         hole=0.4
     )
     ap_donut_chart.update_traces(textposition='inside', textinfo='percent+label')
-    st.plotly_chart(ap_donut_chart, use_container_width=True)
+    with timing.span("render.plotly"):
+        st.plotly_chart(ap_donut_chart, use_container_width=True)
+
+timing.finish_rerun(st, trace, memory=dtypes.memory_report(), imports=lazy.report())
+
 
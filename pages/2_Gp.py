@@ -1,17 +1,15 @@
 import streamlit as st
-import pandas as pd
-import pyodbc
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
-import time
-from streamlit_option_menu import option_menu
 from streamlit_cookies_manager import EncryptedCookieManager
-import requests
+from core import cache, db, dtypes, fee_rates, lazy, paging, timing, upsert
+
+# ใช้แค่ pyodbc.Error ตอน save (connection เองโหลด pyodbc ใน core/db.py)
+pyodbc = lazy.module("pyodbc")
 st.set_page_config(
     page_title="Finance App",
     page_icon="💰",
     layout="wide"
 )
+trace = timing.start_rerun("gp")
 
 
 cookies = EncryptedCookieManager(
@@ -31,32 +29,11 @@ if "logged_in" not in st.session_state or not st.session_state.logged_in:
     st.stop()  # หยุด render หน้า
 current_page = "AP ERP"
 
-# -----------------------------
-# Azure Key Vault
-# -----------------------------
-keyVaultName = "financeproject"
-KVUri = f"https://{keyVaultName}.vault.azure.net/"
-
-credential = DefaultAzureCredential()
-client = SecretClient(vault_url=KVUri, credential=credential)
-
-sql_username = client.get_secret("SQL-Username").value
-sql_password = client.get_secret("SQL-Password").value
-
-server = "assetcontrol.database.windows.net"
-database = "platform_GP"
-
-
 
 # -----------------------------
-# Connect DB
+# Connect DB (shared pool)
 # -----------------------------
-def get_connection():
-    conn = pyodbc.connect(
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={server};DATABASE={database};UID={sql_username};PWD={sql_password}"
-    )
-    return conn
+pool = db.get_pool(db.GP_DB)
 
 st.title("ข้อมูล GP")
 
@@ -66,40 +43,68 @@ st.title("ข้อมูล GP")
 # Load AP_upload
 # -----------------------------
 def load_gp():
-    conn = get_connection()
-    df = pd.read_sql("SELECT * FROM GP", conn)
-    conn.close()
-    st.session_state["GP"] = df
-    return df
+    # view ของ frame กลางใน store (แชร์ทุก session) ต่อ session เก็บแค่ draft ที่แก้
+    return cache.read_sql(db.GP_DB, fee_rates.GP_SQL, snapshot=True, schema=dtypes.GP, name="GP")
+
+
+gp_df = load_gp()
 
 
-# -----------------------------
-# Load data if not in session_state
-# -----------------------------
-if "GP" not in st.session_state:
-    gp_df = load_gp()
-else:
-    gp_df = st.session_state["GP"]
-    
-    
 st.subheader("Data GP (แก้ไขได้)")
 
-# ตารางบน (แก้ไขได้)
-edited_df = st.data_editor(
+# ผลการ save รอบก่อน (หน้าถูก rerun หลัง save เพื่อโหลดข้อมูลใหม่)
+if "gp_save_msg" in st.session_state:
+    st.success(st.session_state.pop("gp_save_msg"))
+
+# ตารางบน (แก้ไขได้) ทีละหน้า ส่วนที่แก้ของทุกหน้าเก็บไว้ใน draft
+edited_df = paging.paged_editor(
+    st,
     gp_df,
+    key="gp_editor",
     num_rows="dynamic",
     use_container_width=True,
-    key="gp_editor"
 )
 
-def save_to_sql(df, incremental_col="ID"):
-    """Saves the dataframe back to the SQL database by overwriting existing data.
-    Supports incremental column by enabling IDENTITY_INSERT."""
-    
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+def save_to_sql(df, incremental_col="ID", mode="diff"):
+    """Saves the edited dataframe back to the SQL database.
+
+    mode="diff" (default) compares it with the GP frame the edits started
+    from and only runs INSERT/UPDATE/DELETE for rows that changed, in one
+    transaction.
+    mode="replace" is the old behaviour: delete everything and re-insert
+    all rows with IDENTITY_INSERT."""
+
     table_name = "GP"
+
+    if mode == "diff":
+        # เทียบกับ frame ที่ draft เริ่มแก้ ไม่ใช่ cache ล่าสุด (คนอื่นอาจ save ไปแล้วระหว่างนั้น)
+        base = paging.editor_base(st, "gp_editor", gp_df)
+        try:
+            diff = upsert.diff_frames(base, df, key=incremental_col)
+            with pool.connection() as conn, timing.span("gp.save") as s:
+                result = upsert.apply_diff(conn, table_name, diff, key=incremental_col)
+                s["rows"] = result["inserted"] + result["updated"] + result["deleted"]
+        except ValueError as ex:
+            # เช่นพิมพ์ ID ไม่ใช่ตัวเลข
+            st.error(f"❌ ข้อมูลไม่ถูกต้อง: {ex}")
+            return
+        except pyodbc.Error as ex:
+            st.error(f"❌ Error saving data: {ex}")
+            return
+
+        # โหลด snapshot ใหม่ และล้าง state ของ editor ไม่ให้ save ซ้ำรอบหน้า
+        cache.refresh(table_name)
+        paging.reset_editor(st, "gp_editor")
+        st.session_state["data_saved"] = True
+        st.session_state["gp_save_msg"] = (
+            f"✅ Changes saved successfully! "
+            f"(insert {result['inserted']}, update {result['updated']}, "
+            f"delete {result['deleted']} rows in {result['seconds']:.2f}s)"
+        )
+        st.rerun()
+
+    conn = pool.acquire()
+    cursor = conn.cursor()
     
     try:
         # ลบข้อมูลเก่า
@@ -120,6 +125,7 @@ def save_to_sql(df, incremental_col="ID"):
         cursor.execute(f"SET IDENTITY_INSERT {table_name} OFF")
         
         conn.commit()
+        cache.refresh(table_name)
         st.success("✅ Changes saved successfully!")
         st.session_state["data_saved"] = True
 
@@ -127,7 +133,7 @@ def save_to_sql(df, incremental_col="ID"):
         st.error(f"❌ Error saving data: {ex}")
         conn.rollback()
     finally:
-        conn.close()
+        pool.release(conn)
 
 
 
@@ -157,4 +163,6 @@ gp1["GP (%)"] = gp1["GP (%)"].apply(lambda x: f"{x:.2f}%")
 # เลือก column ที่จะแสดง
 gp1 = gp1[["Third_party", "ITem_fees", "GP", "GP (%)"]]
 
-st.dataframe(gp1, use_container_width=True)
\ No newline at end of file
+paging.paged_table(st, gp1, key="gp_result", use_container_width=True)
+
+timing.finish_rerun(st, trace, imports=lazy.report())
@@ -1,16 +1,17 @@
 import streamlit as st
-import pandas as pd
-import pyodbc
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
+import numpy as np
 from streamlit_cookies_manager import EncryptedCookieManager
-import plotly.express as px
+from core import charts, fee_rates, lazy, memo, pricing, scenarios, timing
+
+# plotly โหลดตอนวาดกราฟครั้งแรก
+px = lazy.module("plotly.express")
 
 st.set_page_config(
     page_title="Finance App",
     page_icon="💰",
     layout="wide"
 )
+trace = timing.start_rerun("scenario")
 
 # -----------------------------
 # Cookies & login
@@ -31,58 +32,11 @@ if not st.session_state.logged_in:
     st.stop()
 
 # -----------------------------
-# Azure Key Vault & SQL connection
-# -----------------------------
-keyVaultName = "financeproject"
-KVUri = f"https://{keyVaultName}.vault.azure.net/"
-credential = DefaultAzureCredential()
-client = SecretClient(vault_url=KVUri, credential=credential)
-
-sql_username = client.get_secret("SQL-Username").value
-sql_password = client.get_secret("SQL-Password").value
-
-server = "assetcontrol.database.windows.net"
-database = "platform_GP"
-
-def get_connection():
-    return pyodbc.connect(
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={server};DATABASE={database};UID={sql_username};PWD={sql_password}"
-    )
-
-# -----------------------------
-# Load GP from SQL
-# -----------------------------
-def load_gp():
-    conn = get_connection()
-    df = pd.read_sql("SELECT * FROM GP", conn)
-    conn.close()
-    st.session_state["GP1"] = df
-    return df
-
-if "GP1" not in st.session_state:
-    gp_df = load_gp()
-else:
-    gp_df = st.session_state["GP1"]
-
-gp_df["Third_party"] = gp_df["Third_party"].str.strip()
-gp_df["ITem_fees"] = gp_df["ITem_fees"].str.strip()
-gp_df["GP"] = gp_df["GP"].astype(float)
-
-# -----------------------------
-# Create fees dictionary
+# Fee rates from GP (matrix ร้าน × ค่าธรรมเนียม สร้างครั้งเดียวต่อ version ของ GP)
 # -----------------------------
-fees = {}
-for _, row in gp_df.iterrows():
-    shop = row["Third_party"]
-    fee_type = row["ITem_fees"]
-    rate = float(row["GP"])
-    if shop not in fees:
-        fees[shop] = {}
-    fees[shop][fee_type] = rate
-
-fee_types = gp_df["ITem_fees"].unique().tolist()
-shops = gp_df["Third_party"].unique().tolist()
+fee_index = fee_rates.get_fee_index()
+fee_types = fee_index.fee_types
+shops = fee_index.shops
 
 st.title("🪙 คำนวณต้นทุนและกำไรจากร้านค้าออนไลน์")
 st.subheader("ปรับราคาขายและค่าธรรมเนียมต่างๆ เพื่อดูผลกระทบต่อกำไร")
@@ -98,67 +52,35 @@ with col1:
 # -----------------------------
 # Initialize editable DataFrame
 # -----------------------------
-rows = [
-    "ราคาขาย (รวม Vat7%)",
-    "ส่วนลดจากร้านค้า",
-    "ราคาขายหลังหักส่วนลด",
-    "ใช้โค้ดส่วนลด",
-    "ค่าจัดส่งที่ชำระโดยผู้ซื้อ",
-    "ค่าส่งตามจริง (ขนส่ง)",
-    "ยอดชำระผู้ซื้อ"
-] + list(fee_types) + ["ค่าธรรมเนียมรวม", "ยอดเงินบริษัทได้รับ"]
-
-df = pd.DataFrame(index=rows, columns=shops, dtype=float)
-for shop in shops:
-    df[shop] = [float(price), 0.0, float(price), 0.0, 0.0, 0.0, 0.0] + [0.0]*len(fee_types) + [0.0, 0.0]
+df = pricing.empty_table(price, shops, fee_types)
 
 # -----------------------------
 # Update function with total fee & company revenue
+# (คำนวณทุกร้านพร้อมกันเป็น matrix ร้าน × ค่าธรรมเนียม)
 # -----------------------------
-def update_all(df, fees):
-    for shop in df.columns:
-        shop_norm = shop.strip()
-        price_val = float(df.loc["ราคาขาย (รวม Vat7%)", shop])
-        discount_val = float(df.loc["ส่วนลดจากร้านค้า", shop])
-        code_discount = float(df.loc["ใช้โค้ดส่วนลด", shop])
-        buyer_ship = float(df.loc["ค่าจัดส่งที่ชำระโดยผู้ซื้อ", shop])
-        actual_ship = float(df.loc["ค่าส่งตามจริง (ขนส่ง)", shop])
-        
-        net_price = price_val - discount_val
-        df.loc["ราคาขายหลังหักส่วนลด", shop] = net_price
-        
-        buyer_amount = net_price - code_discount - buyer_ship - actual_ship
-        df.loc["ยอดชำระผู้ซื้อ", shop] = buyer_amount
-        
-        for fee_type in fee_types:
-            rate = fees.get(shop_norm, {}).get(fee_type, 0)
-            df.loc[fee_type, shop] = round(buyer_amount * rate, 2)
-
-        total_fee_types = [
-            "ค่าคอมมิชชัน",
-            "ค่าธรรมเนียมขนส่ง Shipping extra",
-            "ค่าธรรมเนียมการชำระเงิน",
-            "ค่าธรรมเนียม Affiliate (10%) +Vat7%"
-        ]
-        total_fee = sum(df.loc[ft, shop] for ft in total_fee_types if ft in df.index)
-        df.loc["ค่าธรรมเนียมรวม", shop] = round(total_fee, 2)
-
-        df.loc["ยอดเงินบริษัทได้รับ", shop] = round(buyer_amount - total_fee, 2)
-
-    return df
-
-df = update_all(df, fees)
+def _update_all(df, rates=None):
+    # ทุก table ในหน้านี้ใช้ column = shops จึงใช้ rate matrix จาก index ได้ตรง ๆ
+    if rates is None and list(df.columns) == shops:
+        rates = fee_index.rates
+    elif rates is None:
+        rates = fee_index.matrix_for(df.columns, fee_types)
+    with timing.span("scenario.update_all", rows=len(df.columns)):
+        return pricing.update_all(df, rates, fee_types)
+
+def update_all(df, rates=None):
+    # ผลขึ้นกับแถวที่แก้ได้ + rate (version ของ GP หรือ rate ของ scenario) เท่านั้น
+    # -> rerun ที่ไม่ได้แก้อะไรได้ผลจาก cache
+    key = memo.fingerprint(
+        "update_all", df.loc[pricing.INPUT_ROWS], fee_index.version if rates is None else rates
+    )
+    return memo.results.get(key, lambda: _update_all(df, rates))
+
+df = update_all(df)
 
 # -----------------------------
 # Editable rows only
 # -----------------------------
-editable_rows = [
-    "ราคาขาย (รวม Vat7%)",
-    "ส่วนลดจากร้านค้า",
-    "ใช้โค้ดส่วนลด",
-    "ค่าจัดส่งที่ชำระโดยผู้ซื้อ",
-    "ค่าส่งตามจริง (ขนส่ง)"
-]
+editable_rows = pricing.INPUT_ROWS
 
 editable_df = df.loc[editable_rows]
 
@@ -172,7 +94,74 @@ edited_df = st.data_editor(
 if edited_df is not None:
     for row in editable_rows:
         df.loc[row] = edited_df.loc[row]
-    df = update_all(df, fees)
+    df = update_all(df)
+
+# -----------------------------
+# Price sweep: ประเมินทุกราคา/ส่วนลด/โค้ด/ค่าส่ง ในครั้งเดียว
+# -----------------------------
+def parse_values(text):
+    values = []
+    for v in text.split(","):
+        try:
+            values.append(float(v))
+        except ValueError:
+            pass  # ข้ามค่าที่ไม่ใช่ตัวเลข
+    return sorted(set(values)) or [0.0]
+
+with st.expander("📈 Price sweep (หาราคาคุ้มทุน / margin เป้าหมาย)"):
+    if st.checkbox("เปิด sweep mode", key="sweep_on"):
+        c1, c2, c3, c4 = st.columns(4)
+        with c1:
+            price_min = st.number_input("ราคาต่ำสุด", min_value=0, value=100, step=10)
+        with c2:
+            price_max = st.number_input("ราคาสูงสุด", min_value=1, value=1000, step=10)
+        with c3:
+            price_step = st.number_input("ระยะห่างราคา", min_value=1, value=5, step=1)
+        with c4:
+            target = st.number_input("ยอดเงินบริษัทได้รับขั้นต่ำ", value=0.0, step=10.0)
+
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            discounts = parse_values(st.text_input("ส่วนลดจากร้านค้า (คั่นด้วย ,)", "0, 20, 50"))
+        with c2:
+            code_discounts = parse_values(st.text_input("ใช้โค้ดส่วนลด (คั่นด้วย ,)", "0, 10"))
+        with c3:
+            shipping = parse_values(st.text_input("ค่าจัดส่งที่ชำระโดยผู้ซื้อ (คั่นด้วย ,)", "0, 40"))
+
+        if price_min > price_max:
+            st.warning("ราคาต่ำสุดต้องไม่มากกว่าราคาสูงสุด")
+        else:
+            prices = np.arange(price_min, price_max + price_step, price_step, dtype=float)
+            prices = prices[prices <= price_max]  # step ที่หารช่วงไม่ลงตัวจะเกิน price_max
+            base_inputs = df.loc[pricing.INPUT_ROWS].to_numpy(dtype=float).T
+            result = pricing.sweep(
+                base_inputs, fee_index.matrix_for(df.columns, fee_types), fee_types,
+                prices, discounts, code_discounts, shipping,
+            )
+            st.caption(f"คำนวณ {len(result['grid']):,} ชุดราคา × {len(shops)} ร้าน")
+
+            # กราฟ: ยอดเงินบริษัทได้รับ vs ราคา ที่ส่วนลด/โค้ด/ค่าส่ง ที่เลือก
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                pick_discount = st.selectbox("ดูที่ส่วนลด", discounts)
+            with c2:
+                pick_code = st.selectbox("ดูที่โค้ดส่วนลด", code_discounts)
+            with c3:
+                pick_ship = st.selectbox("ดูที่ค่าส่งผู้ซื้อ", shipping)
+
+            # เลือกแถวของ grid ก่อน แล้วสร้าง DataFrame เฉพาะส่วนที่แสดง (ไม่กาง grid ทั้งหมด)
+            view_mask = (
+                (result["grid"][:, 1] == pick_discount)
+                & (result["grid"][:, 2] == pick_code)
+                & (result["grid"][:, 3] == pick_ship)
+            )
+            view_result = {k: v[view_mask] for k, v in result.items()}
+            view = pricing.sweep_frame(view_result, shops)
+            fig = px.line(view, x=pricing.PRICE_ROW, y=pricing.REVENUE_ROW, color="shop")
+            fig.add_hline(y=target, line_dash="dash", line_color="gray")
+            st.plotly_chart(fig, use_container_width=True, key="sweep_chart")
+
+            st.dataframe(pricing.break_even(view_result, shops, target).to_frame(), use_container_width=True)
 
 # -----------------------------
 # Dynamic Scenario Tabs in Sidebar
@@ -197,6 +186,63 @@ if st.sidebar.button("ลบ Scenario"):
         st.session_state.scenarios.remove(scenario_to_delete)
         st.rerun()
 
+# donut: figure เดียวต่อ scenario (subplot ละร้าน) หรือ figure เดียวเทียบทุก scenario
+donut_mode = st.sidebar.radio("Donut chart", ["แยกตาม Scenario", "เปรียบเทียบทุก Scenario"], key="donut_mode")
+
+
+def fee_profit(scenario_df):
+    fees = scenario_df.loc[pricing.TOTAL_FEE_ROW, shops].to_numpy(dtype=float)
+    revenues = scenario_df.loc[pricing.REVENUE_ROW, shops].to_numpy(dtype=float)
+    return fees, revenues
+
+
+# -----------------------------
+# Scenario rules: กฎแบบ declarative ต่อ scenario (ค่าเริ่มต้นมาจากชื่อ scenario)
+# compile เป็น array แล้วคำนวณทุก scenario × ทุกร้านในครั้งเดียว (core/scenarios.py)
+# -----------------------------
+rules_by_scenario = {}
+with st.expander("⚙️ กฎของแต่ละ Scenario"):
+    st.caption(
+        "discount_pct = ส่วนลด % ของราคาขาย · shipping = ค่าส่งผู้ซื้อ · code_discount = โค้ดส่วนลด (บาท) · "
+        "set = กำหนดค่าแถว input (target) · fee_rate = อัตราค่าธรรมเนียม (target) · shop ว่าง = ทุกร้าน"
+    )
+    rule_columns = {
+        "type": st.column_config.SelectboxColumn("type", options=scenarios.RULE_TYPES, required=True),
+        "shop": st.column_config.SelectboxColumn("shop", options=[str(s) for s in shops]),
+        "target": st.column_config.SelectboxColumn("target", options=pricing.INPUT_ROWS + list(fee_types)),
+        "value": st.column_config.NumberColumn("value", required=True),
+    }
+    for scenario in st.session_state.scenarios:
+        st.markdown(f"**{scenario}**")
+        edited_rules = st.data_editor(
+            scenarios.rules_frame(scenarios.default_rules(scenario)),
+            num_rows="dynamic",
+            use_container_width=True,
+            column_config=rule_columns,
+            key=f"rules_{scenario}",
+        )
+        rules, errors = scenarios.validate(edited_rules.to_dict("records"), shops, fee_types)
+        for error in errors:
+            st.error(f"{scenario}: {error}")
+        rules_by_scenario[scenario] = rules
+
+
+def evaluate_scenarios():
+    with timing.span("scenario.evaluate", rows=len(rules_by_scenario) * len(shops)):
+        compiled = scenarios.compile_rules(rules_by_scenario, shops, fee_types)
+        return scenarios.evaluate(
+            compiled,
+            df.loc[pricing.INPUT_ROWS].to_numpy(dtype=float).T,
+            fee_index.matrix_for(df.columns, fee_types),
+            pricing.extra_fees(df, fee_types),
+        )
+
+# ผลอ่านตามตำแหน่ง scenario -> key ต้องรวมลำดับชื่อด้วย (dict ถูก hash แบบ sort_keys)
+scenario_result = memo.results.get(
+    memo.fingerprint("scenarios", df.loc[editable_rows], list(rules_by_scenario.items()), fee_index.version),
+    evaluate_scenarios,
+)
+
 # -----------------------------
 # Scenario Tabs with Editable Table + Donut Chart
 # -----------------------------
@@ -206,17 +252,8 @@ scenario_dfs = {}
 for i, scenario in enumerate(st.session_state.scenarios):
     with tabs[i]:
         st.subheader(f"📋 ตาราง {scenario}")
-        df_s = df.copy()
-
-        # ตัวอย่าง logic: ปรับราคาหรือส่วนลดตามชื่อ scenario
-        if scenario.lower().find("ลด") >= 0:
-            for shop in shops:
-                df_s.loc["ส่วนลดจากร้านค้า", shop] = df_s.loc["ราคาขาย (รวม Vat7%)", shop] * 0.10
-        elif scenario.lower().find("ส่งฟรี") >= 0:
-            for shop in shops:
-                df_s.loc["ค่าจัดส่งที่ชำระโดยผู้ซื้อ", shop] = 0
-
-        scenario_df = update_all(df_s, fees)
+        scenario_df = scenarios.to_frame(scenario_result, i, df)
+        scenario_rates = scenario_result["rates"][i]
         scenario_dfs[scenario] = scenario_df
 
         # Editable Table
@@ -230,7 +267,7 @@ for i, scenario in enumerate(st.session_state.scenarios):
         if edited_scenario_df is not None:
             for row in editable_rows:
                 scenario_df.loc[row] = edited_scenario_df.loc[row]
-            scenario_df = update_all(scenario_df, fees)
+            scenario_df = update_all(scenario_df, scenario_rates)
             scenario_dfs[scenario] = scenario_df
 
         # DataFrame display
@@ -239,34 +276,52 @@ for i, scenario in enumerate(st.session_state.scenarios):
 
         st.dataframe(scenario_df, use_container_width=True, height=table_height)
 
-        # Donut Chart
-        st.subheader(f"📊 Portion% Fees VS Profit {scenario}")
-        cols_chart = st.columns(3)
-        for j, shop in enumerate(shops):
-            col = cols_chart[j % 3]
-            with col:
-                labels = ["ค่าธรรมเนียมรวม", "ยอดเงินบริษัทได้รับ"]
-                values = [
-                    scenario_df.loc["ค่าธรรมเนียมรวม", shop],
-                    scenario_df.loc["ยอดเงินบริษัทได้รับ", shop]
-                ]
-                fig = px.pie(
-                    names=labels,
-                    values=values,
-                    hole=0.5,
-                    title=f"{shop}",
-                    color=labels,
-                    color_discrete_map={
-                        "ค่าธรรมเนียมรวม": "#E74C3C",       # แดง
-                        "ยอดเงินบริษัทได้รับ": "#27AE60"      # เขียวเข้ม
-                    }
-                )
-
-                # กำหนดกรอบสี่เหลี่ยมรอบกราฟ
-                fig.update_traces(
-                    marker=dict(line=dict(color='white', width=2))  # ขอบสีขาว กว้าง 2px
-                )
-                # ใส่ key เฉพาะสำหรับแต่ละ chart
-                st.plotly_chart(fig, use_container_width=True, key=f"{scenario}_{shop}_chart")
-            if (j + 1) % 3 == 0:
-                cols_chart = st.columns(3)
+        # Donut Chart (figure spec เดิมถ้าตัวเลขไม่เปลี่ยน)
+        if donut_mode == "แยกตาม Scenario":
+            st.subheader(f"📊 Portion% Fees VS Profit {scenario}")
+            fees, revenues = fee_profit(scenario_df)
+            fig = memo.figures.get(
+                memo.fingerprint("donut_grid", shops, fees, revenues),
+                lambda: charts.donut_grid(shops, fees, revenues),
+            )
+            if fig is not None:
+                with timing.span("render.plotly", rows=len(shops)):
+                    st.plotly_chart(fig, use_container_width=True, key=f"{scenario}_donuts")
+
+if donut_mode == "เปรียบเทียบทุก Scenario" and scenario_dfs:
+    st.subheader("📊 Portion% Fees VS Profit ทุก Scenario")
+    names = list(scenario_dfs)
+    pairs = [fee_profit(scenario_dfs[name]) for name in names]
+    fees = np.array([p[0] for p in pairs])
+    revenues = np.array([p[1] for p in pairs])
+    fig = memo.figures.get(
+        memo.fingerprint("donut_comparison", names, shops, fees, revenues),
+        lambda: charts.donut_comparison(names, shops, fees, revenues),
+    )
+    if fig is not None:
+        with timing.span("render.plotly", rows=fees.size):
+            st.plotly_chart(fig, use_container_width=True, key="scenario_donuts_all")
+
+# -----------------------------
+# เทียบทุก Scenario กับตารางหลัก
+# -----------------------------
+if scenario_dfs:
+    st.subheader("📊 เปรียบเทียบ Scenario (Δ เทียบกับตารางหลัก)")
+    names = list(scenario_dfs)
+    st.dataframe(
+        scenarios.delta_table(
+            names, shops,
+            [scenario_dfs[name].loc[pricing.REVENUE_ROW, shops].to_numpy(dtype=float) for name in names],
+            df.loc[pricing.REVENUE_ROW, shops].to_numpy(dtype=float),
+            total_fee=[scenario_dfs[name].loc[pricing.TOTAL_FEE_ROW, shops].to_numpy(dtype=float) for name in names],
+        ),
+        use_container_width=True,
+    )
+
+results_stats, figure_stats = memo.results.stats(), memo.figures.stats()
+st.sidebar.caption(
+    f"Scenario cache hit {results_stats['hits']} / miss {results_stats['misses']} | "
+    f"figure hit {figure_stats['hits']} / miss {figure_stats['misses']}"
+)
+
+timing.finish_rerun(st, trace, imports=lazy.report())